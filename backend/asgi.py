@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+# Под ASGI эндпоинты чтения каталога обслуживаются асинхронными представлениями
+os.environ.setdefault('ASYNC_CATALOG_VIEWS', '1')
 
 application = get_asgi_application()
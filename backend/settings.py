@@ -1,3 +1,4 @@
+import os
 from datetime import timedelta
 from pathlib import Path
 
@@ -33,7 +34,7 @@ INSTALLED_APPS = [
 # Simple JWT 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'base.authentication.StatelessJWTAuthentication',
     )
    
 }
@@ -68,6 +69,7 @@ SIMPLE_JWT = {
 }
 
 MIDDLEWARE = [
+    'base.middleware.PerformanceMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -100,6 +102,10 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'backend.wsgi.application'
+ASGI_APPLICATION = 'backend.asgi.application'
+
+# Асинхронные представления чтения каталога (base.views.async_product_views). backend.asgi включает их по умолчанию
+ASYNC_CATALOG_VIEWS = os.environ.get('ASYNC_CATALOG_VIEWS', '') == '1'
 
 
 # Database
@@ -156,3 +162,114 @@ CORS_ALLOW_ALL_ORIGINS = True
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Бюджет SQL-запросов на представление (base.utils.query_budget):
+# в DEBUG превышение пишется в лог, в строгом режиме (тесты) - вызывает исключение
+QUERY_BUDGET_STRICT = False
+
+# Поиск товаров (base.search): бэкенд выбирается по СУБД, если не задан явно
+PRODUCT_SEARCH_BACKEND = None
+PRODUCT_SEARCH_LIMIT = 1000
+
+# Кэш. Файловый бэкенд общий для всех воркеров gunicorn на одной машине,
+# для локального запуска в один процесс подойдет и 'django.core.cache.backends.locmem.LocMemCache'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.django_cache',
+    },
+    # Корзины ограничения частоты (base.throttling): отдельно от кэша ответов, чтобы их не вытесняли
+    # закэшированные ответы каталога. Записей - по одной на IP/пользователя/учетную запись в каждой области,
+    # поэтому MAX_ENTRIES с запасом; при нескольких серверах сюда нужен общий кэш (RedisCache)
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.throttle_cache',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+# Время жизни закэшированных ответов каталога (base.cache), сек
+CATALOG_CACHE_TIMEOUT = 300
+
+# Витрина лучших товаров (base.leaderboard): значения по умолчанию для /api/products/top/
+TOP_PRODUCTS = {
+    'LIMIT': 5,
+    'MAX_LIMIT': 50,
+    'MIN_RATING': 4,
+    # В витрине хранятся только товары с рейтингом не ниже этого порога; min_rating ниже него отклоняется (400)
+    'FLOOR_RATING': 3,
+}
+
+# Время жизни кэша пользователя для токенов без claims или выданных до изменения пользователя, сек
+AUTH_USER_CACHE_TIMEOUT = 60
+
+# Максимальное количество товаров в одном запросе /api/products/batch/
+PRODUCT_BATCH_MAX_SIZE = 100
+
+# Уменьшенные копии изображений товаров (строятся фоновой задачей): имя -> (наибольшая сторона, формат) и качество
+PRODUCT_IMAGE_VARIANTS = {
+    'thumb': (200, 'JPEG'),
+    'medium': (800, 'JPEG'),
+    'webp': (800, 'WEBP'),
+}
+IMAGE_QUALITY = 82
+# Изображения с большим числом пикселей не распаковываются (защита памяти обработчика от "бомб")
+IMAGE_MAX_PIXELS = 40_000_000
+
+# Максимальное количество изменений в одном запросе /api/products/bulk/
+PRODUCT_BULK_UPDATE_MAX_SIZE = 1000
+
+# Замеры запросов (base.middleware.PerformanceMiddleware): окно скользящей статистики по эндпоинтам,
+# доля запросов, выполняемых под профилировщиком, и обработчик профиля (по умолчанию - запись в лог).
+# Заголовок Server-Timing раскрывает число SQL-запросов и время этапов, поэтому отдается только в отладке
+# (benchmark_api --base-url берет из него число запросов: проверяемому серверу нужен PERFORMANCE_SERVER_TIMING = True)
+PERFORMANCE_WINDOW = 1000
+PERFORMANCE_SERVER_TIMING = DEBUG
+PERFORMANCE_PROFILE_RATE = 0
+PERFORMANCE_PROFILE_HOOK = None
+
+# Рассылка изменений цен, остатков и рейтингов по Server-Sent Events (base.live, /api/live/, только под ASGI):
+# брокер, окно слияния пачек обновлений, интервал keepalive и время жизни соединения (сек), лимит подписок
+LIVE_BROKER = 'base.live.InMemoryBroker'
+LIVE_COALESCE_MS = 200
+LIVE_HEARTBEAT = 15
+# Django 4.2 не сообщает потоку об отключении клиента (ASGIHandler не слушает http.disconnect во время отдачи,
+# а uvicorn молча отбрасывает запись в закрытое соединение), поэтому брошенное соединение держит подписку
+# до LIVE_MAX_DURATION. Срок короткий, чтобы такие соединения быстро освобождались; EventSource переподключается сам
+LIVE_MAX_DURATION = 60
+LIVE_MAX_CHANNELS = 50
+
+# Закрытие торгов по лотам (base.settlement, команда settle_lots): размер пачки и наибольшая пауза между проверками, сек
+AUCTION_SETTLE_BATCH_SIZE = 500
+AUCTION_SETTLE_INTERVAL = 5
+
+# Автоставки (base.auction): ставка в последние AUCTION_SNIPING_WINDOW секунд продлевает торги
+# до AUCTION_SNIPING_EXTENSION секунд от момента ставки; число повторов разрешения ставки при конкуренции
+AUCTION_SNIPING_WINDOW = 120
+AUCTION_SNIPING_EXTENSION = 120
+AUCTION_BID_RETRIES = 5
+
+# Ограничение частоты запросов (base.throttling): область -> (емкость корзины, скорость пополнения).
+# Корзины хранятся в кэше THROTTLE_CACHE (отдельный псевдоним в CACHES), область без записи не ограничивается
+THROTTLE_BUCKETS = {
+    'login.ip': (20, '10/min'),
+    'login.account': (5, '5/min'),
+    'register.ip': (5, '10/hour'),
+    'review.user': (5, '20/hour'),
+    'review.ip': (20, '60/hour'),
+    'price.user': (10, '30/min'),
+    'price.ip': (30, '60/min'),
+}
+THROTTLE_CACHE = 'throttle'
+
+# Очередь фоновых задач (base.jobs, обработчик - команда run_jobs): число попыток, пауза перед первым повтором
+# (удваивается с каждой попыткой), время, после которого зависшая задача возвращается в очередь, и срок хранения
+# выполненных задач, сек. JOBS_EAGER выполняет задачи сразу после коммита в том же процессе - для запуска без обработчика.
+# Задачи забираются по одной, JOB_BATCH_SIZE - сколько их выполнить между обслуживанием очереди и проверкой остановки
+JOBS_EAGER = False
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_DELAY = 10
+JOB_TIMEOUT = 600
+JOB_KEEP_DONE = 86400
+JOB_BATCH_SIZE = 20
+JOB_POLL_INTERVAL = 1
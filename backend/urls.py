@@ -10,10 +10,14 @@ urlpatterns = [
     path('', TemplateView.as_view(template_name='index.html')),
     path('api/', include([
         path('products/', include('base.urls.product_urls')),
+        path('categories/', include('base.urls.category_urls')),
+        path('lots/', include('base.urls.lot_urls')),
         path('users/', include('base.urls.user_urls')),
-
+        path('orders/', include('base.urls.order_urls')),
+        path('cart/', include('base.urls.cart_urls')),
+        path('metrics/', include('base.urls.metrics_urls')),
+        path('live/', include('base.urls.live_urls')),
     ]))
-    # path('api/orders/', include('base.urls.order_urls')),
 ]
 
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,9 +1,11 @@
 from django.contrib import admin
+from django.core.files.storage import default_storage
 from django.utils.safestring import mark_safe
 
 from treebeard.admin import TreeAdmin
 from treebeard.forms import movenodeform_factory
 
+from .images import schedule_variants
 from .models import *
 
 
@@ -12,6 +14,16 @@ class ReviewInline(admin.TabularInline):
     extra = 0
 
 
+class BidInline(admin.TabularInline):
+    model = Bid
+    extra = 0
+    readonly_fields = ('bidder', 'amount', 'lot_version', 'created_at')
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
@@ -46,4 +58,29 @@ class ProductAdmin(admin.ModelAdmin):
     @staticmethod
     @admin.display(description='Предпросмотр')
     def image_preview(obj: Product) -> str:
-        return mark_safe(f'<img src="{obj.picture.url}" style="max-height: 150px;">')
+        thumb = obj.picture_variants.get('thumb')
+        url = default_storage.url(thumb) if thumb else obj.picture.url
+        return mark_safe(f'<img src="{url}" style="max-height: 150px;">')
+
+    def save_model(self, request, obj: Product, form, change):
+        # Копии загруженного через админку изображения строятся в фоне, как и при загрузке через API
+        picture_changed = 'picture' in form.changed_data
+        if picture_changed:
+            obj.picture_variants = {}
+        super().save_model(request, obj, form, change)
+        if picture_changed and obj.picture:
+            schedule_variants(obj.pk, obj.picture.name)
+
+
+@admin.register(Lot)
+class LotAdmin(admin.ModelAdmin):
+    list_display = ('product', 'current_price', 'bids_num', 'is_active', 'ends_at')
+    readonly_fields = ('current_price', 'leader', 'leader_max', 'bids_num', 'version', 'closed_at', 'order')
+    inlines = (BidInline,)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('task', 'status', 'priority', 'attempts', 'run_at', 'finished_at')
+    list_filter = ('status', 'task')
+    readonly_fields = ('started_at', 'finished_at', 'last_error', 'created_at')
@@ -0,0 +1,54 @@
+from typing import List
+
+from django.db import transaction
+from django.db.models import Count, F, FloatField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+
+from base.cache import CATALOG_SCOPE, invalidate_on_commit
+from base.jobs import enqueue, task
+from base.leaderboard import rebuild_leaderboard, refresh_leaderboard
+from base.live import publish_current
+from base.models import Product, Review
+
+
+def apply_review_rating(product_id: int, rating: int) -> int:
+    """Добавляет оценку к счетчикам товара одним атомарным UPDATE, без пересчета всех отзывов.
+
+    Выражения F() вычисляются на стороне БД по текущим значениям строки,
+    поэтому одновременные отзывы не затирают друг друга.
+    """
+    updated = Product.objects.filter(pk=product_id).update(
+        reviews_num=F('reviews_num') + 1,
+        rating_sum=F('rating_sum') + rating,
+        rating=Cast(F('rating_sum') + rating, FloatField()) / (F('reviews_num') + 1),
+    )
+    # Витрина обновляется в фоне: отзыв не ждет ее пересчета
+    enqueue(refresh_rated_products, product_ids=[product_id])
+    publish_current(Product, [product_id], ['rating', 'reviews_num'])
+    return updated
+
+
+@task(priority=5)
+def refresh_rated_products(product_ids: List[int]) -> None:
+    """Фоновая задача: обновляет витрину после изменения рейтингов и сбрасывает закэшированный каталог"""
+    refresh_leaderboard(product_ids)
+    invalidate_on_commit(CATALOG_SCOPE)
+
+
+def rebuild_review_aggregates() -> int:
+    """Пересчитывает reviews_num, rating_sum и rating всех товаров по таблице отзывов"""
+    reviews = Review.objects.filter(to_product=OuterRef('pk')).order_by().values('to_product')
+    reviews_num = reviews.annotate(value=Count('id')).values('value')
+    rating_sum = reviews.annotate(value=Sum('rating')).values('value')
+
+    with transaction.atomic():
+        updated = Product.objects.update(
+            reviews_num=Coalesce(Subquery(reviews_num, output_field=IntegerField()), Value(0)),
+            rating_sum=Coalesce(Subquery(rating_sum, output_field=IntegerField()), Value(0)),
+        )
+        Product.objects.filter(reviews_num__gt=0).update(
+            rating=Cast(F('rating_sum'), FloatField()) / F('reviews_num'),
+        )
+        Product.objects.filter(reviews_num=0).update(rating=0)
+        rebuild_leaderboard()
+    return updated
@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from base.live import publish_on_commit
+from base.models import Bid, Lot, ProxyBid
+
+
+class BidRejected(Exception):
+    """Ставка не принята. code: invalid, not_found, closed, stale или too_low"""
+
+    def __init__(self, code: str, detail: str, lot: Optional[Lot] = None):
+        super().__init__(detail)
+        self.code = code
+        self.detail = detail
+        self.lot = lot
+
+
+# Наибольшая сумма, которую вмещают поля сумм лота и ставок (max_digits=8, decimal_places=2)
+MAX_AMOUNT = Decimal('999999.99')
+
+
+def parse_amount(value) -> Decimal:
+    try:
+        amount = Decimal(str(value)).quantize(Decimal('0.01'))
+    except (InvalidOperation, TypeError, ValueError):
+        raise BidRejected('invalid', 'Invalid bid amount')
+    # NaN нельзя сравнивать с нулем, а сумма больше MAX_AMOUNT не поместится в БД
+    if not amount.is_finite() or amount <= 0 or amount > MAX_AMOUNT:
+        raise BidRejected('invalid', 'Invalid bid amount')
+    return amount
+
+
+class BidResult:
+    """Итог автоставки: лот после нее, лидирует ли участник и запись о видимом изменении цены (None, если его не было)"""
+
+    def __init__(self, lot: Lot, leading: bool, bid: Optional[Bid] = None):
+        self.lot = lot
+        self.leading = leading
+        self.bid = bid
+
+
+def resolve_bid(lot: Lot, user: User, amount: Decimal) -> dict:
+    """Разрешает автоставку amount против автоставки лидера и возвращает новые значения полей лота.
+
+    Хватает сравнения двух наибольших сумм: автоставка лидера хранится в лоте, а вторая по величине
+    уже отражена в текущей цене. Цена поднимается ровно до шага над проигравшей суммой.
+    """
+    if lot.leader_id == user.pk and lot.leader_max is not None:
+        # Лидер поднимает свой максимум: видимая цена не меняется
+        if amount <= lot.leader_max:
+            raise BidRejected('too_low', f'Your maximum is already {lot.leader_max}', lot)
+        return {'leader_max': amount}
+
+    minimum = minimal_bid(lot)
+    if amount < minimum:
+        raise BidRejected('too_low', f'The bid must be at least {minimum}', lot)
+    if lot.leader_id is None or lot.leader_max is None:
+        return {'leader_id': user.pk, 'leader_max': amount, 'current_price': minimum}
+    if amount > lot.leader_max:
+        return {'leader_id': user.pk, 'leader_max': amount, 'current_price': min(amount, lot.leader_max + lot.min_step)}
+    # Автоставка лидера не перебита (при равенстве побеждает более ранняя): цена растет, лидер прежний
+    return {'current_price': min(lot.leader_max, amount + lot.min_step)}
+
+
+def sniping_extension(lot: Lot, now: datetime) -> Optional[datetime]:
+    """Новое время окончания, если ставка сделана в последние AUCTION_SNIPING_WINDOW секунд торгов"""
+    window = timedelta(seconds=getattr(settings, 'AUCTION_SNIPING_WINDOW', 120))
+    if lot.ends_at is None or lot.ends_at - now > window:
+        return None
+    return max(lot.ends_at, now + timedelta(seconds=getattr(settings, 'AUCTION_SNIPING_EXTENSION', 120)))
+
+
+def place_bid(lot_id: int, user: User, amount: Decimal, expected_version: Optional[int] = None) -> BidResult:
+    """Принимает автоставку: amount - наибольшая сумма, до которой участник готов поднимать цену.
+
+    Состояние лота читается одним запросом и меняется одним условным UPDATE по версии и автоставке лидера:
+    если лот успел измениться, ставка разрешается заново по свежему состоянию. В журнал ставок
+    пишется только видимое изменение цены, ставка в последние минуты торгов продлевает их.
+    Если передана expected_version, ставка принимается только при неизменной версии лота
+    (оптимистическая блокировка), иначе отклоняется как устаревшая.
+    """
+    for _ in range(getattr(settings, 'AUCTION_BID_RETRIES', 5)):
+        now = timezone.now()
+        lot = Lot.objects.filter(pk=lot_id).first()
+        if lot is None:
+            raise BidRejected('not_found', 'Lot does not exist')
+        # Ставки после окончания торгов не принимаются, даже если лот еще не закрыт обработчиком
+        if not lot.is_active or (lot.ends_at is not None and lot.ends_at <= now):
+            raise BidRejected('closed', 'Bidding on this lot is closed', lot)
+        if expected_version is not None and lot.version != expected_version:
+            raise BidRejected('stale', 'The lot has changed since you loaded it', lot)
+
+        changes = resolve_bid(lot, user, amount)
+        visible = 'current_price' in changes
+        if visible:
+            changes.update(version=lot.version + 1, bids_num=lot.bids_num + 1)
+            ends_at = sniping_extension(lot, now)
+            if ends_at is not None:
+                changes['ends_at'] = ends_at
+
+        leader_max = Q(leader_max__isnull=True) if lot.leader_max is None else Q(leader_max=lot.leader_max)
+        with transaction.atomic():
+            if not Lot.objects.filter(leader_max, pk=lot_id, version=lot.version, is_active=True).update(**changes):
+                continue
+            ProxyBid.objects.bulk_create([ProxyBid(lot_id=lot_id, bidder_id=user.pk, max_amount=amount)],
+                                         update_conflicts=True, unique_fields=['lot', 'bidder'],
+                                         update_fields=['max_amount', 'updated_at'])
+            for field, value in changes.items():
+                setattr(lot, field, value)
+            bid = None
+            if visible:
+                bid = Bid.objects.create(lot_id=lot_id, bidder_id=lot.leader_id, amount=lot.current_price,
+                                         lot_version=lot.version)
+                publish_on_commit(Lot, lot_id, changes)
+        return BidResult(lot, lot.leader_id == user.pk, bid)
+
+    raise BidRejected('stale', 'The lot is changing too fast, please try again', lot)
+
+
+def minimal_bid(lot: Lot) -> Decimal:
+    return lot.current_price if not lot.bids_num else lot.current_price + lot.min_step
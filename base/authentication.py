@@ -0,0 +1,114 @@
+import math
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from base.models import TokenRevocation
+
+
+# Данные пользователя, которые кладутся в токен, чтобы не читать пользователя из БД на каждый запрос
+USER_CLAIMS = ('username', 'email', 'first_name', 'is_staff')
+
+
+def add_user_claims(token, user: User):
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+def _user_key(user_id) -> str:
+    return f'auth:user:{user_id}'
+
+
+def _changed_key(user_id) -> str:
+    return f'auth:user-changed:{user_id}'
+
+
+def _changed_timeout() -> int:
+    return int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+
+
+def invalidate_user(user_id, deleted: bool = False) -> None:
+    """Сбрасывает кэш пользователя и помечает выданные ранее токены как устаревшие.
+
+    Отметка хранится в БД (TokenRevocation), кэш только ускоряет ее чтение: после вытеснения
+    из кэша старые токены все равно проходят через чтение пользователя из БД, а не берут данные из claims.
+    У удаленного пользователя отметка удаляется вместе с ним, такие токены отклоняет get_cached_user.
+    """
+    if deleted:
+        changed_at = math.inf
+    else:
+        changed_at = int(time.time())
+        TokenRevocation.objects.bulk_create([TokenRevocation(user_id=user_id, changed_at=changed_at)],
+                                            update_conflicts=True, unique_fields=['user'],
+                                            update_fields=['changed_at'])
+
+    def reset():
+        cache.delete(_user_key(user_id))
+        cache.set(_changed_key(user_id), changed_at, timeout=_changed_timeout())
+
+    # Сразу - чтобы этот запрос увидел изменения, после фиксации - чтобы не осталось значения,
+    # прочитанного из БД другим запросом до фиксации
+    reset()
+    transaction.on_commit(reset)
+
+
+def token_changed_at(user_id) -> float:
+    """Когда пользователь менялся в последний раз (unix time, сек): 0 - не менялся,
+    бесконечность - удален или неактивен, claims его токенов не принимаются"""
+    key = _changed_key(user_id)
+    changed_at = cache.get(key)
+    if changed_at is None:
+        row = (User.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+               .values_list('is_active', 'token_revocation__changed_at').first())
+        if row is None or not row[0]:
+            changed_at = math.inf
+        else:
+            changed_at = row[1] or 0
+        cache.set(key, changed_at, timeout=_changed_timeout())
+    return changed_at
+
+
+def get_cached_user(user_id) -> User:
+    key = _user_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        try:
+            user = User.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+        except User.DoesNotExist:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        cache.set(key, user, timeout=getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60))
+
+    if not user.is_active:
+        raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+    return user
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация без чтения пользователя из БД.
+
+    Если в токене есть все USER_CLAIMS и пользователь не менялся после выдачи токена,
+    request.user - это TokenUser, собранный из claims. Иначе пользователь читается из БД
+    через кэш с коротким временем жизни.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        if all(claim in validated_token for claim in USER_CLAIMS):
+            # iat - целые секунды: токен, выданный в ту же секунду, что и изменение (например, при входе), принимается
+            if validated_token.get('iat', 0) >= token_changed_at(user_id):
+                return TokenUser(validated_token)
+
+        return get_cached_user(user_id)
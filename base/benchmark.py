@@ -0,0 +1,224 @@
+import json
+import random
+import re
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from base.aggregates import rebuild_review_aggregates
+from base.categories import rebuild_product_counts
+from base.models import CartItem, Category, Lot, Order, OrderItem, Product, Review
+from base.search import get_search_backend
+
+
+BENCH_EMAIL = 'bench-user@example.com'
+BENCH_PASSWORD = 'bench-password'
+WORDS = ('naruto', 'goku', 'figure', 'poster', 'manga', 'hoodie', 'mug', 'keychain', 'limited', 'vintage',
+         'deluxe', 'mini', 'plush', 'artbook', 'cosplay', 'sticker')
+
+# Эндпоинты: (имя, URL, нужна ли авторизация). {product}, {category}, {order}, {lot} - id из засеянного каталога
+ENDPOINTS = [
+    ('products', '/api/products/', False),
+    ('products: page 3', '/api/products/?page=3', False),
+    ('products: with reviews', '/api/products/?expand=reviews', False),
+    ('products: category', '/api/products/?category={category}', False),
+    ('products: search', '/api/products/?keyword=naruto figure', False),
+    ('products: cursor by rating', '/api/products/?paginate=cursor&ordering=rating', False),
+    ('products: top', '/api/products/top/', False),
+    ('products: detail', '/api/products/{product}/', False),
+    ('products: batch', '/api/products/batch/?ids={product_ids}', False),
+    ('categories', '/api/categories/', False),
+    ('lots', '/api/lots/', False),
+    ('lots: detail', '/api/lots/{lot}/', False),
+    ('cart', '/api/cart/', True),
+    ('orders: my', '/api/orders/myorders/', True),
+    ('orders: detail', '/api/orders/{order}/', True),
+    ('users: profile', '/api/users/profile/', True),
+]
+
+# Число запросов из заголовка Server-Timing (base.middleware.PerformanceMiddleware)
+QUERIES_PATTERN = re.compile(r'desc="(\d+) queries"')
+
+
+def seed_catalog(products: int = 1000, categories: int = 30, reviews_per_product: int = 5, users: int = 50,
+                 orders: int = 500, lots: int = 20, seed: int = 0) -> dict:
+    """Заполняет БД синтетическим каталогом пачками bulk_create и пересчитывает производные данные.
+
+    Возвращает id объектов, которые подставляются в URL эндпоинтов.
+    """
+    rng = random.Random(seed)
+    with transaction.atomic():
+        password = make_password(BENCH_PASSWORD)
+        bench_user = User.objects.create(username=BENCH_EMAIL, email=BENCH_EMAIL, first_name='Bench', password=password)
+        User.objects.bulk_create([User(username=f'bench-{number}@example.com', email=f'bench-{number}@example.com',
+                                       password=password) for number in range(users)], batch_size=500)
+        customers = list(User.objects.filter(username__startswith='bench-').exclude(pk=bench_user.pk)
+                         .values_list('pk', flat=True))
+        customers.append(bench_user.pk)
+
+        # Дерево: около sqrt(categories) корней, остальные категории - их потомки
+        roots = [Category.add_root(name=f'Category {number}') for number in range(max(int(categories ** 0.5), 1))]
+        nodes = [root.pk for root in roots]
+        for number in range(len(roots), categories):
+            # Узлы упорядочены по имени: вставка сдвигает пути соседей, поэтому родитель читается заново
+            parent = Category.objects.get(pk=rng.choice(nodes))
+            nodes.append(parent.add_child(name=f'Category {number}').pk)
+
+        catalog = [
+            Product(title=' '.join(rng.sample(WORDS, 3)).capitalize() + f' {number}',
+                    price=Decimal(rng.randint(100, 100000)) / 100,
+                    description=' '.join(rng.choices(WORDS, k=30)),
+                    vendor=rng.choice(('Bandai', 'Funko', 'Good Smile', 'Kotobukiya')),
+                    stock_quantity=rng.randint(0, 50), category_id=rng.choice(nodes))
+            for number in range(products)
+        ]
+        Product.objects.bulk_create(catalog, batch_size=1000)
+        product_ids = list(Product.objects.order_by('pk').values_list('pk', flat=True))
+
+        Review.objects.bulk_create([
+            Review(to_product_id=pk, reviewer_id=reviewer, rating=rng.randint(1, 5), comment=' '.join(rng.choices(WORDS, k=20)))
+            for pk in product_ids
+            for reviewer in rng.sample(customers, min(reviews_per_product, len(customers)))
+        ], batch_size=1000)
+
+        order_rows = Order.objects.bulk_create([
+            Order(customer_id=rng.choice(customers), payment_method='PayPal') for _ in range(orders)
+        ], batch_size=1000)
+        Order.objects.bulk_create([Order(customer_id=bench_user.pk, payment_method='PayPal')])
+        order_ids = list(Order.objects.order_by('pk').values_list('pk', 'customer_id'))
+        OrderItem.objects.bulk_create([
+            OrderItem(order_id=order_id, product_id=pk, title='Item', quantity=rng.randint(1, 3), price=Decimal(10))
+            for order_id, _ in order_ids
+            for pk in rng.sample(product_ids, min(3, len(product_ids)))
+        ], batch_size=1000)
+
+        lot_rows = Lot.objects.bulk_create([
+            Lot(product_id=pk, start_price=Decimal(10), current_price=Decimal(10))
+            for pk in rng.sample(product_ids, min(lots, len(product_ids)))
+        ])
+        CartItem.objects.bulk_create([CartItem(customer=bench_user, product_id=pk, quantity=1)
+                                      for pk in product_ids[:5]])
+
+    rebuild_review_aggregates()
+    rebuild_product_counts()
+    with transaction.atomic():
+        get_search_backend().rebuild()
+
+    return {
+        'product': product_ids[len(product_ids) // 2],
+        'product_ids': ','.join(map(str, product_ids[:20])),
+        'category': roots[0].pk,
+        'order': next(order_id for order_id, customer in order_ids if customer == bench_user.pk),
+        'lot': Lot.objects.order_by('pk').values_list('pk', flat=True).first() or 0,
+        'sizes': {'products': products, 'categories': categories, 'reviews': products * reviews_per_product,
+                  'users': users, 'orders': len(order_rows) + 1, 'lots': len(lot_rows)},
+    }
+
+
+def catalog_ids() -> dict:
+    """id объектов для URL эндпоинтов из уже заполненной БД (для прогона против запущенного сервера)"""
+    product_ids = list(Product.objects.order_by('pk').values_list('pk', flat=True)[:20])
+    return {
+        'product': product_ids[len(product_ids) // 2] if product_ids else 0,
+        'product_ids': ','.join(map(str, product_ids)),
+        'category': Category.get_root_nodes().values_list('pk', flat=True).first() or 0,
+        'order': Order.objects.filter(customer__username=BENCH_EMAIL).values_list('pk', flat=True).first() or 0,
+        'lot': Lot.objects.order_by('pk').values_list('pk', flat=True).first() or 0,
+        'sizes': {'products': Product.objects.count()},
+    }
+
+
+# Отправка запроса: (url, заголовки) -> (статус, число SQL-запросов или None)
+Sender = Callable[[str, dict], Tuple[int, Optional[int]]]
+
+
+def parse_queries(server_timing: str) -> Optional[int]:
+    match = QUERIES_PATTERN.search(server_timing or '')
+    return int(match.group(1)) if match else None
+
+
+def test_client_sender(client) -> Sender:
+    def send(url: str, headers: dict) -> Tuple[int, Optional[int]]:
+        response = client.get(url, **{f'HTTP_{name.upper().replace("-", "_")}': value
+                                       for name, value in headers.items()})
+        return response.status_code, parse_queries(response.get('Server-Timing'))
+    return send
+
+
+def http_sender(base_url: str) -> Sender:
+    def send(url: str, headers: dict) -> Tuple[int, Optional[int]]:
+        request = urllib.request.Request(base_url.rstrip('/') + url.replace(' ', '%20'), headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+                return response.status, parse_queries(response.headers.get('Server-Timing'))
+        except urllib.error.HTTPError as error:
+            return error.code, parse_queries(error.headers.get('Server-Timing'))
+    return send
+
+
+def percentile(values: List[float], rank: int) -> float:
+    ordered = sorted(values)
+    return ordered[max(-(-rank * len(ordered) // 100) - 1, 0)]
+
+
+def run_endpoint(send: Sender, url: str, headers: dict, requests: int, concurrency: int = 1, warmup: int = 5) -> dict:
+    """Выполняет requests запросов к url и возвращает пропускную способность, процентили и число SQL-запросов"""
+    for _ in range(warmup):
+        send(url, headers)
+
+    def timed(_):
+        started = time.perf_counter()
+        status, queries = send(url, headers)
+        return (time.perf_counter() - started) * 1000, status, queries
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(timed, range(requests)))
+    else:
+        results = [timed(number) for number in range(requests)]
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for latency, _, _ in results]
+    queries = [value for _, _, value in results if value is not None]
+    return {
+        'requests': requests,
+        'errors': sum(1 for _, status, _ in results if status >= 400),
+        'rps': round(requests / elapsed, 1),
+        'mean_ms': round(sum(latencies) / len(latencies), 2),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'queries': round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def compare_results(baseline: dict, current: dict, threshold: float) -> Tuple[List[str], List[str]]:
+    """Сравнивает два прогона. Возвращает строки отчета и список регрессий:
+    рост p95 больше чем на threshold процентов или рост числа SQL-запросов"""
+    lines, regressions = [], []
+    for name, result in current['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if before is None:
+            lines.append(f'{name}: new endpoint')
+            continue
+        change = (result['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0
+        line = (f'{name}: p95 {before["p95_ms"]} -> {result["p95_ms"]} ms ({change:+.1f}%), '
+                f'rps {before["rps"]} -> {result["rps"]}, queries {before["queries"]} -> {result["queries"]}')
+        lines.append(line)
+        if change > threshold or (result['queries'] or 0) > (before['queries'] or 0):
+            regressions.append(line)
+    return lines, regressions
+
+
+def load_results(path: str) -> Dict:
+    with open(path, encoding='utf-8') as stream:
+        return json.load(stream)
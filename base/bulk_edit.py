@@ -0,0 +1,178 @@
+from collections import Counter
+from decimal import Decimal
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Subquery
+from django.db.models.functions import Round
+
+from base.cache import CATALOG_SCOPE, PRODUCTS_SCOPE, invalidate_on_commit, product_scope
+from base.categories import adjust_product_counts
+from base.live import publish_current
+from base.models import Category, Product
+from base.search import SEARCH_FIELDS, get_search_backend
+
+
+# Наибольшая цена, которую вмещает Product.price (max_digits=8, decimal_places=2)
+MAX_PRICE = Decimal('999999.99')
+
+
+def _text(limit: Optional[int] = None):
+    def parse(value) -> str:
+        if not isinstance(value, str):
+            raise ValueError('must be a string')
+        if limit is not None and len(value) > limit:
+            raise ValueError(f'must be at most {limit} characters')
+        return value
+    return parse
+
+
+def _price(value) -> Decimal:
+    try:
+        price = Decimal(str(value)).quantize(Decimal('0.01'))
+    except ArithmeticError:
+        raise ValueError('must be a number')
+    if not price.is_finite():
+        raise ValueError('must be a number')
+    if price < 0:
+        raise ValueError('must not be negative')
+    if price > MAX_PRICE:
+        raise ValueError(f'must be at most {MAX_PRICE}')
+    return price
+
+
+def _quantity(value) -> int:
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise ValueError('must be a non-negative integer')
+    return value
+
+
+def _category(value) -> int:
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError('must be a category id')
+    return value
+
+
+# Поля, которые можно менять пакетно, и их разбор. Категория задается id
+EDITABLE_FIELDS = {
+    'title': _text(200),
+    'price': _price,
+    'description': _text(),
+    'vendor': _text(200),
+    'stock_quantity': _quantity,
+    'category': _category,
+}
+
+
+class BulkUpdateRejected(Exception):
+    """Пакет изменений отклонен целиком. errors - ошибки по номерам позиций пакета"""
+
+    def __init__(self, detail: str, errors: Optional[dict] = None):
+        super().__init__(detail)
+        self.detail = detail
+        self.errors = errors or {}
+
+
+def parse_updates(updates) -> dict:
+    """Проверяет пакет частичных изменений и возвращает {id товара: {поле: значение}}"""
+    if not isinstance(updates, list) or not updates:
+        raise BulkUpdateRejected('Expected a non-empty list of updates')
+    if len(updates) > getattr(settings, 'PRODUCT_BULK_UPDATE_MAX_SIZE', 1000):
+        raise BulkUpdateRejected('Too many updates in one request')
+
+    changes, errors = {}, {}
+    for number, update in enumerate(updates):
+        if not isinstance(update, dict) or isinstance(update.get('id'), bool) or not isinstance(update.get('id'), int):
+            errors[number] = 'Each update needs an integer id'
+            continue
+        values = {}
+        for field, value in update.items():
+            if field == 'id':
+                continue
+            if field not in EDITABLE_FIELDS:
+                errors[number] = f'{field}: cannot be updated'
+                break
+            try:
+                values[field] = EDITABLE_FIELDS[field](value)
+            except (TypeError, ValueError) as error:
+                errors[number] = f'{field}: {error or "invalid value"}'
+                break
+        if number not in errors:
+            # Повторные изменения одного товара объединяются, последнее значение поля побеждает
+            changes.setdefault(update['id'], {}).update(values)
+    if errors:
+        raise BulkUpdateRejected('Some updates are invalid', errors)
+    return changes
+
+
+def apply_updates(updates) -> int:
+    """Применяет частичные изменения товаров в одной транзакции.
+
+    Товары читаются одним запросом (только изменяемые колонки), записываются bulk_update.
+    Сигналы при этом не вызываются, поэтому счетчики категорий, поисковый индекс и кэш
+    обновляются здесь же, по одному разу на весь пакет.
+    """
+    changes = parse_updates(updates)
+    fields = sorted({field for values in changes.values() for field in values})
+    reindex = bool(set(fields) & set(SEARCH_FIELDS))
+    columns = {*fields, 'category', *(SEARCH_FIELDS if reindex else ())}
+
+    with transaction.atomic():
+        categories = {values['category'] for values in changes.values() if 'category' in values}
+        unknown = categories - set(Category.objects.filter(pk__in=categories).values_list('pk', flat=True))
+        if unknown:
+            raise BulkUpdateRejected(f'Unknown categories: {", ".join(map(str, sorted(unknown)))}')
+
+        products = Product.objects.select_for_update().only(*columns).in_bulk(list(changes))
+        missing = changes.keys() - products.keys()
+        if missing:
+            raise BulkUpdateRejected(f'Unknown products: {", ".join(map(str, sorted(missing)))}')
+
+        moved = Counter()
+        for pk, values in changes.items():
+            product = products[pk]
+            if 'category' in values and values['category'] != product.category_id:
+                moved[product.category_id] -= 1
+                moved[values['category']] += 1
+            for field, value in values.items():
+                setattr(product, 'category_id' if field == 'category' else field, value)
+
+        Product.objects.bulk_update(products.values(), fields, batch_size=500)
+        for category_id, delta in moved.items():
+            adjust_product_counts(category_id, delta)
+        if reindex:
+            get_search_backend().index(products.values())
+        invalidate_on_commit(CATALOG_SCOPE, *(product_scope(pk) for pk in products))
+        publish_current(Product, products, fields)
+    return len(products)
+
+
+def adjust_prices(percent, category_id: Optional[int] = None) -> int:
+    """Меняет цены на percent процентов одним UPDATE; category_id ограничивает поддеревом категории"""
+    try:
+        factor = 1 + Decimal(str(percent)) / 100
+    except (ArithmeticError, ValueError):
+        raise BulkUpdateRejected('Invalid percent')
+    if not factor.is_finite():
+        raise BulkUpdateRejected('Invalid percent')
+    if factor <= 0:
+        raise BulkUpdateRejected('Percent must be greater than -100')
+
+    products = Product.objects.all()
+    if category_id is not None:
+        if not Category.objects.filter(pk=category_id).exists():
+            raise BulkUpdateRejected('Unknown category')
+        category_path = Category.objects.filter(pk=category_id).values('path')[:1]
+        products = products.filter(category__path__startswith=Subquery(category_path))
+
+    with transaction.atomic():
+        # id затронутых товаров нужны только подписчикам; кэш карточек сбрасывается одним общим поколением
+        ids = list(products.select_for_update().values_list('pk', flat=True))
+        highest = products.aggregate(highest=Max('price'))['highest']
+        if highest is not None and round(highest * factor, 2) > MAX_PRICE:
+            raise BulkUpdateRejected(f'Prices would exceed {MAX_PRICE}')
+        updated = products.update(price=Round(F('price') * factor, 2))
+        invalidate_on_commit(CATALOG_SCOPE, PRODUCTS_SCOPE)
+        publish_current(Product, ids, ['price'])
+    return updated
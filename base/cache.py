@@ -0,0 +1,173 @@
+import hashlib
+import json
+import time
+from functools import wraps
+from typing import Callable, Iterable, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from base.utils import DataJsonResponse
+
+
+CACHE_PREFIX = 'catalog'
+CATALOG_SCOPE = 'catalog'
+# Общее поколение карточек всех товаров: сдвигается массовыми изменениями вместо версий каждого товара
+PRODUCTS_SCOPE = 'products'
+
+
+def product_scope(pk: int) -> str:
+    return f'product:{pk}'
+
+
+def product_scopes(request, pk: int) -> List[str]:
+    """Области кэша карточки товара: версия самого товара и общее поколение карточек"""
+    return [PRODUCTS_SCOPE, product_scope(pk)]
+
+
+def _version_key(scope: str) -> str:
+    return f'{CACHE_PREFIX}:version:{scope}'
+
+
+def get_versions(scopes: Iterable[str]) -> dict:
+    """Текущие версии областей кэша. Версия - момент последней инвалидации (unix time)"""
+    keys = {_version_key(scope): scope for scope in scopes}
+    versions = cache.get_many(keys)
+    missing = {key: time.time() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions |= missing
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def invalidate(*scopes: str) -> None:
+    """Сдвигает версии областей: все закэшированные по ним ответы перестают использоваться"""
+    now = time.time()
+    cache.set_many({_version_key(scope): now for scope in scopes}, timeout=None)
+
+
+def invalidate_on_commit(*scopes: str) -> None:
+    # Инвалидируем после фиксации транзакции, иначе параллельный запрос закэширует старые данные под новой версией
+    transaction.on_commit(lambda: invalidate(*scopes))
+
+
+def _normalize_params(params) -> str:
+    params = sorted((key, sorted(value for value in values if value)) for key, values in params.lists())
+    return json.dumps([param for param in params if param[1]])
+
+
+def _not_modified(request, etag: str, last_modified: float) -> bool:
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return etag in (tag.strip() for tag in if_none_match.split(',')) or if_none_match.strip() == '*'
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and int(last_modified) <= if_modified_since
+
+
+def _response_key(endpoint: str, args, kwargs, params, versions: dict) -> str:
+    key_source = json.dumps([endpoint, args, sorted(kwargs.items()), _normalize_params(params),
+                             sorted(versions.items())], default=str)
+    return f'{CACHE_PREFIX}:response:{endpoint}:{hashlib.md5(key_source.encode()).hexdigest()}'
+
+
+def _cache_entry(data) -> tuple:
+    content = json.dumps(data, cls=JSONEncoder, sort_keys=True)
+    return data, quote_etag(hashlib.md5(content.encode()).hexdigest())
+
+
+def _add_validators(response, etag: str, last_modified: float):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'no-cache'
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def catalog_scopes(request, **kwargs) -> List[str]:
+    return [CATALOG_SCOPE]
+
+
+def cache_anonymous_response(endpoint: str, scopes: Callable[..., List[str]] = catalog_scopes):
+    """Кэширует ответ представления для анонимных GET-запросов.
+
+    Ключ строится из имени эндпоинта, аргументов URL, нормализованных query-параметров
+    и версий областей кэша (scopes), поэтому инвалидация сводится к сдвигу версии.
+    Ответ снабжается заголовками ETag и Last-Modified, на условные запросы отдается 304.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+
+            versions = get_versions(scopes(request, **kwargs))
+            last_modified = max(versions.values())
+            key = _response_key(endpoint, args, kwargs, request.query_params, versions)
+
+            entry = cache.get(key)
+            if entry is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                entry = _cache_entry(response.data)
+                cache.set(key, entry, timeout=getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
+
+            data, etag = entry
+            if _not_modified(request, etag, last_modified):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = Response(data)
+            return _add_validators(response, etag, last_modified)
+        return wrapper
+    return decorator
+
+
+async def aget_versions(scopes: Iterable[str]) -> dict:
+    keys = {_version_key(scope): scope for scope in scopes}
+    versions = await cache.aget_many(keys)
+    missing = {key: time.time() for key in keys if key not in versions}
+    if missing:
+        await cache.aset_many(missing, timeout=None)
+        versions |= missing
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def cache_anonymous_response_async(endpoint: str, scopes: Callable[..., List[str]] = catalog_scopes):
+    """cache_anonymous_response для асинхронных представлений, возвращающих DataJsonResponse.
+
+    Аутентификация DRF в асинхронных представлениях не выполняется, поэтому анонимным
+    считается запрос без заголовка Authorization. Ключи кэша общие с синхронными представлениями.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or 'HTTP_AUTHORIZATION' in request.META:
+                return await view(request, *args, **kwargs)
+
+            versions = await aget_versions(scopes(request, **kwargs))
+            last_modified = max(versions.values())
+            key = _response_key(endpoint, args, kwargs, request.GET, versions)
+
+            entry = await cache.aget(key)
+            if entry is None:
+                response = await view(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                entry = _cache_entry(response.data)
+                await cache.aset(key, entry, timeout=getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
+
+            data, etag = entry
+            if _not_modified(request, etag, last_modified):
+                response = HttpResponseNotModified()
+            else:
+                response = DataJsonResponse(data)
+            return _add_validators(response, etag, last_modified)
+        return wrapper
+    return decorator
@@ -0,0 +1,56 @@
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from base.models import CartItem, Product
+
+
+SLIM_PRODUCT_FIELDS = ('id', 'title', 'price', 'stock_quantity', 'picture', 'picture_variants')
+
+
+def parse_ids(raw: str) -> List[int]:
+    """Разбирает список id вида "1,2,3", сохраняя порядок и убирая повторы"""
+    ids = list(dict.fromkeys(int(value) for value in raw.split(',') if value.strip()))
+    if len(ids) > getattr(settings, 'PRODUCT_BATCH_MAX_SIZE', 100):
+        raise ValueError('Too many ids')
+    return ids
+
+
+def load_products(ids: Iterable[int]) -> Dict[int, Product]:
+    """Краткие карточки товаров одним запросом"""
+    return Product.objects.only(*SLIM_PRODUCT_FIELDS).in_bulk(list(ids))
+
+
+def validate_items(items: List[Tuple[int, int, Optional[Decimal]]]) -> List[dict]:
+    """Проверяет цены и остатки всех позиций корзины за один запрос к БД.
+
+    items - тройки (id товара, количество, цена, которую видел покупатель, или None).
+    """
+    products = load_products(pk for pk, _, _ in items)
+    results = []
+    for pk, quantity, seen_price in items:
+        product = products.get(pk)
+        if product is None:
+            results.append({'product': pk, 'quantity': quantity, 'problems': ['missing']})
+            continue
+        problems = []
+        if seen_price is not None and seen_price != product.price:
+            problems.append('price_changed')
+        if product.stock_quantity < quantity:
+            problems.append('insufficient_stock')
+        results.append({'product': pk, 'quantity': quantity, 'price': str(product.price),
+                        'stock_quantity': product.stock_quantity, 'problems': problems})
+    return results
+
+
+def replace_cart(user_id: int, items: List[Tuple[int, int]]) -> List[int]:
+    """Заменяет содержимое корзины. Возвращает id товаров, которых не существует"""
+    existing = set(Product.objects.filter(pk__in=[pk for pk, _ in items]).values_list('pk', flat=True))
+    quantities = {pk: quantity for pk, quantity in items if pk in existing and quantity > 0}
+    with transaction.atomic():
+        CartItem.objects.filter(customer_id=user_id).delete()
+        CartItem.objects.bulk_create([CartItem(customer_id=user_id, product_id=pk, quantity=quantity)
+                                      for pk, quantity in quantities.items()])
+    return sorted({pk for pk, _ in items} - existing)
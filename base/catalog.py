@@ -0,0 +1,66 @@
+from decimal import Decimal
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.db.models import QuerySet, Subquery
+
+from base.leaderboard import leaderboard_floor
+from base.models import Category, Product
+from base.serializers import PRODUCT_LIST_FIELDS, ProductFieldset
+
+
+# Товаров на странице списка
+PRODUCTS_PER_PAGE = 8
+
+
+class CatalogParamsError(ValueError):
+    """Некорректные параметры запроса к каталогу"""
+
+
+def catalog_queryset(params) -> Tuple[QuerySet, ProductFieldset]:
+    """Выборка товаров каталога по параметрам запроса и набор полей ответа. Запросы к БД не выполняются"""
+    # Набор полей ответа (?fields=, ?expand=reviews); по умолчанию - карточка без отзывов
+    try:
+        fieldset = ProductFieldset(params, default_fields=PRODUCT_LIST_FIELDS)
+    except ValueError as error:
+        raise CatalogParamsError(str(error))
+
+    products = Product.objects.filter(stock_quantity__gte=1)  #.order_by('-_id')
+
+    # Товары категории и всех ее подкатегорий: сравнение материализованного пути в одном JOIN
+    category_id = params.get('category')
+    if category_id:
+        if not category_id.isdigit():
+            raise CatalogParamsError('Invalid category')
+        category_path = Category.objects.filter(pk=category_id).values('path')[:1]
+        products = products.filter(category__path__startswith=Subquery(category_path))
+    return products, fieldset
+
+
+def top_products_params(params) -> Tuple[int, Decimal, Optional[int], ProductFieldset]:
+    """Параметры витрины лучших товаров: limit, min_rating, id категории и набор полей.
+
+    В витрине хранятся только товары с рейтингом не ниже TOP_PRODUCTS['FLOOR_RATING'],
+    поэтому min_rating ниже этого порога отклоняется, а не поднимается до него молча.
+    """
+    top = settings.TOP_PRODUCTS
+    try:
+        limit = min(int(params.get('limit', top['LIMIT'])), top['MAX_LIMIT'])
+        min_rating = Decimal(params.get('min_rating', str(top['MIN_RATING'])))
+        if not min_rating.is_finite():
+            # NaN и бесконечность нельзя сравнивать с порогом витрины
+            raise ValueError(min_rating)
+        category_id = params.get('category')
+        fieldset = ProductFieldset(params, default_fields=PRODUCT_LIST_FIELDS)
+    except (ValueError, ArithmeticError):
+        raise CatalogParamsError('Invalid leaderboard parameters')
+
+    floor = leaderboard_floor()
+    if min_rating < floor:
+        raise CatalogParamsError(f'min_rating must be at least {floor}')
+    return max(limit, 0), min_rating, int(category_id) if category_id else None, fieldset
+
+
+def page_number(page: int, pages: int) -> int:
+    """Номер отдаваемой страницы как в get_products: за пределами диапазона - последняя"""
+    return page if 1 <= page <= pages else pages
@@ -0,0 +1,166 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import Dict, Iterable, Iterator, Optional, TextIO, Tuple
+
+from django.db import transaction
+
+from base.models import Category, Product
+from base.search import get_search_backend
+
+
+# Колонки файла каталога. Категория задается путем имен от корня: "Аниме/Фигурки"
+EXPORT_FIELDS = ('id', 'title', 'price', 'description', 'vendor', 'stock_quantity', 'picture', 'category')
+CATEGORY_SEPARATOR = '/'
+# Имена полей старого формата (base/products.py) -> поля модели
+FIELD_ALIASES = {'name': 'title', 'brand': 'vendor', 'countInStock': 'stock_quantity', 'image': 'picture'}
+
+
+class ImportRowError(ValueError):
+    """Строка файла каталога не может быть импортирована"""
+
+    def __init__(self, line: int, detail: str):
+        super().__init__(f'line {line}: {detail}')
+        self.line = line
+        self.detail = detail
+
+
+def read_rows(stream: TextIO, file_format: str) -> Iterator[Tuple[int, dict]]:
+    """Построчно читает CSV или JSONL, не загружая файл в память. Отдает пары (номер строки, данные)"""
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError as error:
+            raise ImportRowError(line, f'invalid JSON ({error})')
+        if not isinstance(row, dict):
+            raise ImportRowError(line, 'expected a JSON object')
+        yield line, row
+
+
+class CategoryResolver:
+    """Находит категорию по пути имен. Дерево читается один раз, пути кэшируются в словаре"""
+
+    def __init__(self, create: bool = False):
+        self.create = create
+        self.ids: Dict[Tuple[str, ...], int] = {}
+        self.names: Dict[int, str] = {}
+
+        parents = []
+        for category in Category.get_tree():
+            del parents[category.depth - 1:]
+            parents.append(category.name)
+            self.ids[tuple(parents)] = category.pk
+            self.names[category.pk] = CATEGORY_SEPARATOR.join(parents)
+
+    @staticmethod
+    def split(value: str) -> Tuple[str, ...]:
+        return tuple(part.strip() for part in str(value).split(CATEGORY_SEPARATOR) if part.strip())
+
+    def resolve(self, value: str) -> Optional[int]:
+        parts = self.split(value)
+        if not parts:
+            return None
+        if parts in self.ids or not self.create:
+            return self.ids.get(parts)
+
+        # Недостающие уровни пути создаются по одному, от ближайшего существующего предка
+        parent = self.resolve(CATEGORY_SEPARATOR.join(parts[:-1])) if len(parts) > 1 else None
+        if parent is None:
+            category = Category.add_root(name=parts[-1])
+        else:
+            # Узлы упорядочены по имени: вставка сдвигает пути соседей, поэтому родитель читается заново
+            category = Category.objects.get(pk=parent).add_child(name=parts[-1])
+        self.ids[parts] = category.pk
+        self.names[category.pk] = CATEGORY_SEPARATOR.join(parts)
+        return category.pk
+
+
+def build_product(line: int, row: dict, categories: CategoryResolver) -> Product:
+    data = {FIELD_ALIASES.get(key, key): value for key, value in row.items()}
+
+    title = str(data.get('title') or '').strip()
+    if not title:
+        raise ImportRowError(line, 'title is required')
+    category_id = categories.resolve(data.get('category') or '')
+    if category_id is None:
+        raise ImportRowError(line, f'unknown category "{data.get("category") or ""}"')
+    try:
+        price = Decimal(str(data.get('price'))).quantize(Decimal('0.01'))
+        stock_quantity = int(data.get('stock_quantity') or 0)
+    except (InvalidOperation, TypeError, ValueError):
+        raise ImportRowError(line, 'invalid price or stock_quantity')
+    if price < 0 or stock_quantity < 0:
+        raise ImportRowError(line, 'price and stock_quantity must not be negative')
+
+    product = Product(
+        title=title[:200],
+        price=price,
+        description=data.get('description') or '',
+        vendor=(data.get('vendor') or '')[:200],
+        stock_quantity=stock_quantity,
+        category_id=category_id,
+    )
+    if data.get('picture'):
+        product.picture = data['picture']
+    return product
+
+
+def import_products(rows: Iterable[Tuple[int, dict]], categories: CategoryResolver, chunk_size: int = 5000,
+                    batch_size: int = 1000, skip_invalid: bool = False, on_chunk=None) -> Tuple[int, list]:
+    """Вставляет товары пачками bulk_create, каждая порция из chunk_size строк - в своей транзакции.
+
+    bulk_create не вызывает сигналы: поисковый индекс пополняется в той же транзакции,
+    а счетчики категорий и кэш нужно обновить после импорта (см. команду import_products).
+    Возвращает число вставленных товаров и ошибки пропущенных строк.
+    """
+    rows = iter(rows)
+    created, errors = 0, []
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return created, errors
+        with transaction.atomic():
+            products = []
+            for line, row in chunk:
+                try:
+                    products.append(build_product(line, row, categories))
+                except ImportRowError as error:
+                    if not skip_invalid:
+                        raise
+                    errors.append(error)
+            Product.objects.bulk_create(products, batch_size=batch_size)
+            get_search_backend().index(products)
+        created += len(products)
+        if on_chunk is not None:
+            on_chunk(created)
+
+
+def export_products(stream: TextIO, file_format: str, chunk_size: int = 2000) -> int:
+    """Потоково выгружает товары в CSV или JSONL, читая таблицу порциями через iterator()"""
+    category_names = CategoryResolver().names
+    rows = Product.objects.order_by('pk').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+
+    writer = csv.writer(stream) if file_format == 'csv' else None
+    if writer is not None:
+        writer.writerow(EXPORT_FIELDS)
+
+    exported = 0
+    for values in rows:
+        row = dict(zip(EXPORT_FIELDS, values))
+        row['category'] = category_names.get(row['category'], '')
+        if writer is not None:
+            writer.writerow(row[field] for field in EXPORT_FIELDS)
+        else:
+            row['price'] = str(row['price'])
+            stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+        exported += 1
+    return exported
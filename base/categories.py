@@ -0,0 +1,50 @@
+from collections import Counter
+from typing import List, Optional
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from base.models import Category, Product
+
+
+def ancestor_paths(path: str) -> List[str]:
+    """Материализованные пути узла и всех его предков"""
+    return [path[:end] for end in range(Category.steplen, len(path) + 1, Category.steplen)]
+
+
+def adjust_product_counts(category_id: Optional[int], delta: int) -> None:
+    """Изменяет счетчик товаров у категории и всех ее предков одним UPDATE"""
+    if category_id is None or not delta:
+        return
+    path = Category.objects.filter(pk=category_id).values_list('path', flat=True).first()
+    if path is not None:
+        Category.objects.filter(path__in=ancestor_paths(path)).update(products_num=F('products_num') + delta)
+
+
+def rebuild_product_counts() -> int:
+    """Пересчитывает счетчики всех категорий: два запроса на чтение и пакетное обновление"""
+    direct = dict(Product.objects.order_by().values_list('category').annotate(num=Count('id')))
+    categories = list(Category.get_tree())
+    paths = {category.pk: category.path for category in categories}
+
+    totals = Counter()
+    for category_id, num in direct.items():
+        for path in ancestor_paths(paths[category_id]):
+            totals[path] += num
+    for category in categories:
+        category.products_num = totals[category.path]
+
+    with transaction.atomic():
+        Category.objects.bulk_update(categories, ['products_num'], batch_size=500)
+    return len(categories)
+
+
+def build_category_tree() -> List[dict]:
+    """Дерево категорий из одного запроса get_tree(): узлы идут в порядке обхода в глубину"""
+    roots, stack = [], []
+    for category in Category.get_tree():
+        node = {'id': category.pk, 'name': category.name, 'products_num': category.products_num, 'children': []}
+        del stack[category.depth - 1:]
+        (stack[-1]['children'] if stack else roots).append(node)
+        stack.append(node)
+    return roots
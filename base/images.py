@@ -0,0 +1,99 @@
+import hashlib
+import os
+from io import BytesIO
+from typing import Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from base.cache import CATALOG_SCOPE, invalidate, product_scope
+from base.jobs import enqueue, task
+from base.models import Job, Product
+
+
+# Копии изображения товара: имя -> (наибольшая сторона в пикселях, формат Pillow)
+DEFAULT_VARIANTS = {
+    'thumb': (200, 'JPEG'),
+    'medium': (800, 'JPEG'),
+    'webp': (800, 'WEBP'),
+}
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp', 'PNG': 'png'}
+VARIANTS_DIR = 'img/variants'
+# Наибольшее число пикселей изображения, которое обработчик согласен распаковать
+DEFAULT_MAX_PIXELS = 40_000_000
+
+
+def image_variants() -> dict:
+    return getattr(settings, 'PRODUCT_IMAGE_VARIANTS', DEFAULT_VARIANTS)
+
+
+def save_upload(product: Product, upload: UploadedFile) -> str:
+    """Сохраняет оригинал изображения и ставит построение копий в очередь фоновых задач.
+
+    Файл записывается в хранилище по частям (UploadedFile.chunks), без чтения в память целиком;
+    копии строит обработчик очереди (команда run_jobs), ответ на загрузку их не ждет.
+    """
+    name = default_storage.save(product.picture.field.generate_filename(product, upload.name), upload)
+    product.picture.name = name
+    product.picture_variants = {}
+    with transaction.atomic():
+        product.save(update_fields=['picture', 'picture_variants'])
+        schedule_variants(product.pk, name)
+    return name
+
+
+def schedule_variants(product_id: int, name: str) -> Optional[Job]:
+    return enqueue(build_variants, product_id=product_id, name=name)
+
+
+def open_image(file) -> Image.Image:
+    """Открывает изображение, не распаковывая его: Image.open читает только заголовок.
+
+    Маленький файл может описывать огромную картинку, поэтому размер проверяется до load().
+    """
+    image = Image.open(file)
+    width, height = image.size
+    max_pixels = getattr(settings, 'IMAGE_MAX_PIXELS', DEFAULT_MAX_PIXELS)
+    if width * height > max_pixels:
+        raise ValueError(f'Image is too large: {width}x{height} pixels, at most {max_pixels} allowed')
+    return image
+
+
+def render_variant(image: Image.Image, size: int, image_format: str) -> bytes:
+    copy = image.copy()
+    copy.thumbnail((size, size), Image.Resampling.LANCZOS)
+    if image_format == 'JPEG' and copy.mode != 'RGB':
+        copy = copy.convert('RGB')
+    buffer = BytesIO()
+    copy.save(buffer, image_format, quality=getattr(settings, 'IMAGE_QUALITY', 82), optimize=True)
+    return buffer.getvalue()
+
+
+@task(priority=10)
+def build_variants(product_id: int, name: str) -> dict:
+    """Строит копии изображения name и записывает их имена в picture_variants товара.
+
+    Имя файла копии содержит хэш содержимого, поэтому копии можно отдавать с вечным кэшированием.
+    Если за время обработки у товара сменилось изображение, результат не записывается.
+    """
+    with default_storage.open(name, 'rb') as original:
+        image = ImageOps.exif_transpose(open_image(original))
+        image.load()
+
+    stem = os.path.splitext(os.path.basename(name))[0]
+    variants = {}
+    for variant, (size, image_format) in image_variants().items():
+        content = render_variant(image, size, image_format)
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        path = f'{VARIANTS_DIR}/{stem}.{variant}.{digest}.{EXTENSIONS[image_format]}'
+        if not default_storage.exists(path):
+            path = default_storage.save(path, ContentFile(content))
+        variants[variant] = path
+
+    if Product.objects.filter(pk=product_id, picture=name).update(picture_variants=variants):
+        invalidate(CATALOG_SCOPE, product_scope(product_id))
+    return variants
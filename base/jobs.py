@@ -0,0 +1,140 @@
+import logging
+import traceback
+from datetime import timedelta
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from base.models import Job
+
+
+logger = logging.getLogger(__name__)
+
+
+def task(priority: int = 0, max_attempts: Optional[int] = None):
+    """Разрешает ставить функцию в очередь фоновых задач и задает ее приоритет и число попыток.
+
+    Аргументы задачи передаются именованными и должны сериализоваться в JSON.
+    """
+    def decorator(func: Callable) -> Callable:
+        func.job_priority = priority
+        func.job_max_attempts = max_attempts
+        return func
+    return decorator
+
+
+def task_path(func: Callable) -> str:
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def resolve_task(path: str) -> Callable:
+    func = import_string(path)
+    if not hasattr(func, 'job_priority'):
+        # Из очереди выполняются только функции, объявленные задачами
+        raise ValueError(f'{path} is not a task')
+    return func
+
+
+def enqueue(func: Callable, priority: Optional[int] = None, delay: float = 0, **kwargs) -> Optional[Job]:
+    """Ставит задачу в очередь и сразу возвращается.
+
+    Строка задачи пишется в текущей транзакции: обработчик увидит ее только после коммита,
+    а при откате она исчезнет вместе с остальными изменениями. При JOBS_EAGER задача
+    выполняется в этом же процессе после коммита (для запуска без обработчика).
+    """
+    if getattr(settings, 'JOBS_EAGER', False):
+        transaction.on_commit(lambda: func(**kwargs))
+        return None
+    return Job.objects.create(
+        task=task_path(func),
+        payload=kwargs,
+        priority=func.job_priority if priority is None else priority,
+        max_attempts=func.job_max_attempts or getattr(settings, 'JOB_MAX_ATTEMPTS', 3),
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def claim_job() -> Optional[Job]:
+    """Забирает одну готовую к выполнению задачу с наибольшим приоритетом.
+
+    Задачи забираются по одной непосредственно перед выполнением, поэтому started_at - момент
+    начала именно этой задачи, а не пачки, и задачи в ожидании не считаются зависшими.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = Job.objects.filter(status=Job.QUEUED, run_at__lte=now).order_by('-priority', 'run_at', 'pk')
+        if connection.features.has_select_for_update_skip_locked:
+            # Параллельные обработчики забирают разные задачи, не дожидаясь друг друга
+            jobs = jobs.select_for_update(skip_locked=True)
+        job = jobs.first()
+        if job is None:
+            return None
+        # Условный UPDATE: задачу, которую успел забрать другой обработчик, этот не выполнит
+        claimed = Job.objects.filter(pk=job.pk, status=Job.QUEUED)
+        if not claimed.update(status=Job.RUNNING, started_at=now, attempts=F('attempts') + 1):
+            return None
+    job.status, job.started_at, job.attempts = Job.RUNNING, now, job.attempts + 1
+    return job
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Пауза перед повтором растет вдвое с каждой неудачной попыткой"""
+    return timedelta(seconds=getattr(settings, 'JOB_RETRY_DELAY', 10) * 2 ** (attempts - 1))
+
+
+def run_job(job: Job) -> bool:
+    """Выполняет задачу в транзакции. При ошибке изменения задачи откатываются,
+    а сама она возвращается в очередь с паузой, пока не исчерпаны попытки"""
+    try:
+        func = resolve_task(job.task)
+        with transaction.atomic():
+            func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Job %s (%s) failed, attempt %s of %s', job.pk, job.task, job.attempts, job.max_attempts)
+        if job.attempts < job.max_attempts:
+            Job.objects.filter(pk=job.pk).update(status=Job.QUEUED, last_error=error,
+                                                 run_at=timezone.now() + retry_delay(job.attempts))
+        else:
+            Job.objects.filter(pk=job.pk).update(status=Job.FAILED, last_error=error, finished_at=timezone.now())
+        return False
+    Job.objects.filter(pk=job.pk).update(status=Job.DONE, finished_at=timezone.now())
+    return True
+
+
+def requeue_stale(timeout: Optional[float] = None) -> int:
+    """Возвращает в очередь задачи, которые выполняются дольше JOB_TIMEOUT: их обработчик, скорее всего, упал.
+
+    Задачи, исчерпавшие попытки, помечаются невыполненными: задача, которая сама роняет обработчик,
+    не должна перезапускаться бесконечно. Возвращает число возвращенных в очередь задач.
+    """
+    timeout = timeout or getattr(settings, 'JOB_TIMEOUT', 600)
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING, started_at__lt=now - timedelta(seconds=timeout))
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=now, last_error=f'Timed out after {timeout} seconds')
+    return stale.filter(attempts__lt=F('max_attempts')).update(status=Job.QUEUED, run_at=now)
+
+
+def purge_finished(keep: Optional[float] = None) -> int:
+    """Удаляет выполненные задачи старше JOB_KEEP_DONE секунд; невыполненные остаются для разбора"""
+    keep = keep or getattr(settings, 'JOB_KEEP_DONE', 86400)
+    return Job.objects.filter(status=Job.DONE, finished_at__lt=timezone.now() - timedelta(seconds=keep)).delete()[0]
+
+
+def run_pending(limit: Optional[int] = None) -> int:
+    """Выполняет готовые задачи, пока они есть, но не больше limit за вызов.
+    Возвращает число выполненных попыток: меньше limit - очередь опустела"""
+    limit = limit or getattr(settings, 'JOB_BATCH_SIZE', 20)
+    processed = 0
+    while processed < limit:
+        job = claim_job()
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
@@ -0,0 +1,62 @@
+from decimal import Decimal
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+
+from base.models import Category, Product, TopProduct
+
+
+def leaderboard_floor() -> Decimal:
+    """Минимальный рейтинг, с которым товар попадает в витрину"""
+    return Decimal(str(settings.TOP_PRODUCTS['FLOOR_RATING']))
+
+
+def refresh_leaderboard(product_ids: Iterable[int]) -> None:
+    """Обновляет записи витрины для товаров, у которых мог измениться рейтинг"""
+    product_ids = list(product_ids)
+    ratings = dict(Product.objects.filter(pk__in=product_ids, rating__gte=leaderboard_floor())
+                   .values_list('pk', 'rating'))
+    with transaction.atomic():
+        TopProduct.objects.filter(product_id__in=product_ids).exclude(product_id__in=ratings).delete()
+        TopProduct.objects.bulk_create(
+            [TopProduct(product_id=pk, rating=rating) for pk, rating in ratings.items()],
+            update_conflicts=True, unique_fields=['product'], update_fields=['rating'],
+        )
+
+
+def rebuild_leaderboard() -> int:
+    entries = [TopProduct(product_id=pk, rating=rating) for pk, rating in
+               Product.objects.filter(rating__gte=leaderboard_floor()).values_list('pk', 'rating').iterator()]
+    with transaction.atomic():
+        TopProduct.objects.all().delete()
+        TopProduct.objects.bulk_create(entries, batch_size=1000)
+    return len(entries)
+
+
+def get_top_products(limit: int, min_rating: Decimal, category: Optional[Category] = None,
+                     columns: Optional[List[str]] = None, with_reviews: bool = True) -> List[Product]:
+    """Лучшие товары по рейтингу: чтение первых limit записей индекса витрины и их отзывов.
+
+    columns ограничивает читаемые колонки товара, with_reviews=False отключает загрузку отзывов.
+    """
+    entries = top_entries(min_rating, category, columns, with_reviews)
+    return [entry.product for entry in entries[:limit]]
+
+
+def top_entries(min_rating: Decimal, category: Optional[Category] = None, columns: Optional[List[str]] = None,
+                with_reviews: bool = True) -> QuerySet:
+    """Записи витрины в порядке убывания рейтинга (запрос для get_top_products и асинхронных представлений).
+
+    Товаров с рейтингом ниже leaderboard_floor() в витрине нет: такой min_rating отклоняет top_products_params.
+    """
+    entries = TopProduct.objects.filter(rating__gte=min_rating)
+    if category is not None:
+        entries = entries.filter(product__category__path__startswith=category.path)
+    entries = entries.select_related('product')
+    if columns is not None:
+        entries = entries.only('rating', *(f'product__{column}' for column in columns))
+    if with_reviews:
+        entries = entries.prefetch_related('product__reviews')
+    return entries.order_by('-rating', '-product_id')
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from decimal import Decimal
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import models, transaction
+from django.utils.module_loading import import_string
+from rest_framework.utils.encoders import JSONEncoder
+
+from base.models import Lot, Product
+
+
+# Поля, изменения которых рассылаются подписчикам товара и лота
+LIVE_FIELDS = {
+    Product: ('price', 'stock_quantity', 'rating', 'reviews_num'),
+    Lot: ('current_price', 'bids_num', 'version', 'is_active', 'ends_at'),
+}
+# Виды каналов, на которые можно подписаться: имя параметра запроса -> модель
+LIVE_KINDS = {'products': Product, 'lots': Lot}
+
+
+def channel(model, pk: int) -> str:
+    return f'{model._meta.model_name}:{pk}'
+
+
+class Subscription:
+    """Подписка одного соединения на набор каналов.
+
+    Изменения, пришедшие между выдачами, сливаются по каналам: из пачки обновлений одного товара
+    клиент получает одно сообщение с последними значениями полей.
+    """
+
+    def __init__(self, channels: Iterable[str], coalesce: float):
+        self.channels = set(channels)
+        self.coalesce = coalesce
+        self._loop = asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+        self._lock = threading.Lock()
+        self._pending: Dict[str, dict] = {}
+
+    def push(self, channel: str, data: dict) -> None:
+        # Вызывается из потока, в котором была зафиксирована транзакция
+        with self._lock:
+            notify = not self._pending
+            self._pending.setdefault(channel, {}).update(data)
+        if notify:
+            self._loop.call_soon_threadsafe(self._ready.set)
+
+    async def next(self, timeout: float) -> List[Tuple[str, dict]]:
+        """Ждет изменений не дольше timeout секунд и возвращает их, слитые по каналам"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        # Даем пачке обновлений накопиться, чтобы отправить ее одной записью
+        if self.coalesce:
+            await asyncio.sleep(self.coalesce)
+        with self._lock:
+            self._ready.clear()
+            pending, self._pending = self._pending, {}
+        return list(pending.items())
+
+
+class BaseBroker:
+    """Интерфейс брокера сообщений между источниками изменений и открытыми соединениями"""
+
+    def publish(self, channel: str, data: dict) -> None:
+        raise NotImplementedError
+
+    def has_subscribers(self, channel: str) -> bool:
+        # Брокер, который не знает о подписчиках других процессов, должен возвращать True
+        return True
+
+    def subscribe(self, channels: Iterable[str]) -> Subscription:
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        raise NotImplementedError
+
+
+class InMemoryBroker(BaseBroker):
+    """Брокер в памяти процесса. Подписчики получают только изменения, сделанные в том же процессе,
+    поэтому при нескольких воркерах его нужно заменить брокером поверх внешней шины (LIVE_BROKER)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+
+    def publish(self, channel: str, data: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.push(channel, data)
+
+    def has_subscribers(self, channel: str) -> bool:
+        return channel in self._subscribers
+
+    def subscribe(self, channels: Iterable[str]) -> Subscription:
+        subscription = Subscription(channels, getattr(settings, 'LIVE_COALESCE_MS', 200) / 1000)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+
+@lru_cache(maxsize=None)
+def get_broker() -> BaseBroker:
+    return import_string(getattr(settings, 'LIVE_BROKER', 'base.live.InMemoryBroker'))()
+
+
+def live_values(model, values: dict) -> dict:
+    """Приводит значения полей к виду, в котором их отдает API: десятичные числа - строками с точностью поля"""
+    result = {}
+    for name, value in values.items():
+        field = model._meta.get_field(name)
+        value = field.to_python(value)
+        if isinstance(field, models.DecimalField) and value is not None:
+            value = str(value.quantize(Decimal(1).scaleb(-field.decimal_places)))
+        result[name] = value
+    return result
+
+
+def publish_on_commit(model, pk: int, values: dict) -> None:
+    """Отправляет изменение подписчикам после фиксации транзакции (сразу, если транзакции нет)"""
+    values = live_values(model, {field: value for field, value in values.items() if field in LIVE_FIELDS[model]})
+    if values:
+        transaction.on_commit(lambda: get_broker().publish(channel(model, pk), values))
+
+
+def publish_saved(instance, update_fields: Optional[Iterable[str]] = None) -> None:
+    """Рассылает отслеживаемые поля объекта, сохраненного save() (с учетом update_fields)"""
+    fields = LIVE_FIELDS[type(instance)]
+    if update_fields is not None:
+        fields = [field for field in fields if field in update_fields]
+    publish_on_commit(type(instance), instance.pk, {field: getattr(instance, field) for field in fields})
+
+
+def publish_current(model, pks: Iterable[int], fields: Optional[Iterable[str]] = None) -> None:
+    """Рассылает текущие значения полей объектов, измененных UPDATE с F() (значения известны только БД).
+
+    Значения читаются после фиксации транзакции и только для объектов, у которых есть подписчики.
+    """
+    pks = list(pks)
+    fields = [field for field in (fields or LIVE_FIELDS[model]) if field in LIVE_FIELDS[model]]
+    if not pks or not fields:
+        return
+
+    def send():
+        broker = get_broker()
+        watched = [pk for pk in pks if broker.has_subscribers(channel(model, pk))]
+        for start in range(0, len(watched), 500):
+            for values in model.objects.filter(pk__in=watched[start:start + 500]).values('pk', *fields):
+                broker.publish(channel(model, values.pop('pk')), live_values(model, values))
+
+    transaction.on_commit(send)
+
+
+def encode_event(name: str, data: dict) -> str:
+    """Сообщение Server-Sent Events: тип события - вид объекта, в данных id и измененные поля"""
+    kind, pk = name.split(':', 1)
+    payload = json.dumps({'id': int(pk), **data}, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':'))
+    return f'event: {kind}\ndata: {payload}\n\n'
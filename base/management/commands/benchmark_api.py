@@ -0,0 +1,152 @@
+import json
+import subprocess
+import time
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from base.benchmark import (BENCH_EMAIL, BENCH_PASSWORD, ENDPOINTS, catalog_ids, compare_results, http_sender,
+                            load_results, run_endpoint, seed_catalog, test_client_sender)
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный прогон REST API: засевает синтетический каталог в тестовую БД, выполняет запросы '
+            'к эндпоинтам через тестовый клиент или к запущенному серверу (--base-url) и сохраняет '
+            'пропускную способность, процентили задержки и число SQL-запросов в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--categories', type=int, default=30)
+        parser.add_argument('--reviews-per-product', type=int, default=5)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--orders', type=int, default=500)
+        parser.add_argument('--requests', type=int, default=200, help='Запросов к каждому эндпоинту')
+        parser.add_argument('--concurrency', type=int, default=1, help='Параллельных запросов (только с --base-url)')
+        parser.add_argument('--only', default='', help='Подстрока имени эндпоинта для выборочного прогона')
+        parser.add_argument('--no-cache', action='store_true', help='Отключить кэш ответов каталога')
+        parser.add_argument('--base-url', default='',
+                            help='Адрес запущенного сервера, например http://127.0.0.1:8000. Каталог не засевается, '
+                                 'используются данные его БД (подготовьте их через --seed-only)')
+        parser.add_argument('--seed-only', action='store_true',
+                            help='Засеять каталог в настроенную БД проекта и завершиться')
+        parser.add_argument('--output', default='', help='Файл для результатов в JSON')
+        parser.add_argument('--compare', default='', help='JSON предыдущего прогона для сравнения')
+        parser.add_argument('--threshold', type=float, default=20,
+                            help='Допустимый рост p95 в процентах при сравнении')
+
+    def handle(self, *args, **options):
+        if options['seed_only']:
+            ids = seed_catalog(**self.sizes(options))
+            self.stdout.write(self.style.SUCCESS(f'Catalog seeded: {ids["sizes"]}'))
+            return
+
+        caches = settings.CACHES
+        if options['no_cache']:
+            caches = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        elif not options['base_url']:
+            # Отдельный кэш в памяти, чтобы ответы прошлых прогонов не влияли на результат
+            caches = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+        # Число SQL-запросов берется из заголовка Server-Timing
+        with override_settings(CACHES=caches, PERFORMANCE_SERVER_TIMING=True):
+            if options['base_url']:
+                results = self.run_live(options)
+            else:
+                results = self.run_in_test_database(options)
+
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(results, stream, indent=2)
+            self.stdout.write(f'Results saved to {options["output"]}')
+        if options['compare']:
+            lines, regressions = compare_results(load_results(options['compare']), results, options['threshold'])
+            for line in lines:
+                self.stdout.write(line)
+            if regressions:
+                raise CommandError(f'{len(regressions)} endpoints regressed')
+            self.stdout.write(self.style.SUCCESS('No regressions'))
+
+    @staticmethod
+    def sizes(options) -> dict:
+        return {'products': options['products'], 'categories': options['categories'],
+                'reviews_per_product': options['reviews_per_product'], 'users': options['users'],
+                'orders': options['orders']}
+
+    def run_in_test_database(self, options) -> dict:
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        databases = runner.setup_databases()
+        try:
+            started = time.perf_counter()
+            ids = seed_catalog(**self.sizes(options))
+            self.stdout.write(f'Catalog seeded in {time.perf_counter() - started:.1f}s: {ids["sizes"]}')
+            client = Client()
+            return self.run_endpoints(test_client_sender(client), ids, options, mode='test-client',
+                                      token=self.login(lambda data: client.post('/api/users/login/', data).json()))
+        finally:
+            runner.teardown_databases(databases)
+            teardown_test_environment()
+
+    def run_live(self, options) -> dict:
+        ids = catalog_ids()
+        send = http_sender(options['base_url'])
+
+        def login(data):
+            request = urllib.request.Request(options['base_url'].rstrip('/') + '/api/users/login/', json.dumps(data).encode(),
+                                             headers={'Content-Type': 'application/json'})
+            with urllib.request.urlopen(request, timeout=30) as response:
+                return json.loads(response.read())
+
+        return self.run_endpoints(send, ids, options, mode=options['base_url'], token=self.login(login))
+
+    def login(self, post) -> str:
+        try:
+            return post({'username': BENCH_EMAIL, 'password': BENCH_PASSWORD}).get('access', '')
+        except Exception as error:
+            self.stderr.write(f'Login as {BENCH_EMAIL} failed ({error}), endpoints with auth are skipped')
+            return ''
+
+    def run_endpoints(self, send, ids: dict, options, mode: str, token: str) -> dict:
+        concurrency = options['concurrency'] if options['base_url'] else 1
+        endpoints = {}
+        for name, url, needs_auth in ENDPOINTS:
+            if options['only'] and options['only'] not in name:
+                continue
+            if needs_auth and not token:
+                continue
+            headers = {'Authorization': f'Bearer {token}'} if needs_auth else {}
+            endpoints[name] = run_endpoint(send, url.format(**ids), headers, options['requests'], concurrency)
+            self.stdout.write(f'  {name}: {endpoints[name]["rps"]} rps, p95 {endpoints[name]["p95_ms"]} ms')
+
+        return {
+            'meta': {
+                'commit': self.commit(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'mode': mode,
+                'database': settings.DATABASES['default']['ENGINE'],
+                'cache': not options['no_cache'],
+                'requests': options['requests'],
+                'concurrency': concurrency,
+                'catalog': ids['sizes'],
+            },
+            'endpoints': endpoints,
+        }
+
+    def report(self, results: dict):
+        self.stdout.write(f'{"endpoint":<30} {"rps":>8} {"p50":>8} {"p95":>8} {"p99":>8} {"queries":>8} {"errors":>7}')
+        for name, result in results['endpoints'].items():
+            self.stdout.write(f'{name:<30} {result["rps"]:>8} {result["p50_ms"]:>8} {result["p95_ms"]:>8} '
+                              f'{result["p99_ms"]:>8} {str(result["queries"]):>8} {result["errors"]:>7}')
+
+    @staticmethod
+    def commit() -> str:
+        try:
+            return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                  cwd=settings.BASE_DIR, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ''
@@ -0,0 +1,76 @@
+import threading
+import time
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+
+from base.auction import BidRejected, minimal_bid, place_bid
+from base.models import Lot, Product
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест: несколько потоков делают ставки на один лот, выводится число принятых ставок в секунду'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lot', type=int, help='id лота. Без него создается временный лот на первый товар')
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--bids', type=int, default=100, help='Количество попыток на поток')
+        parser.add_argument('--keep', action='store_true', help='Не удалять временный лот и его ставки')
+
+    def handle(self, *args, **options):
+        lot = self.get_lot(options['lot'])
+        bidders = [User.objects.get_or_create(username=f'loadtest-bidder-{number}')[0]
+                   for number in range(options['threads'])]
+        results = Counter()
+        lock = threading.Lock()
+
+        def bidder_loop(user: User):
+            local = Counter()
+            try:
+                for _ in range(options['bids']):
+                    # Оптимистическая ставка: читаем версию и цену, ставим минимально допустимую сумму
+                    current = Lot.objects.only('current_price', 'min_step', 'bids_num', 'version').get(pk=lot.pk)
+                    try:
+                        result = place_bid(lot.pk, user, minimal_bid(current), expected_version=current.version)
+                        # Лидер, поднявший свою автоставку, не меняет видимую цену и не попадает в журнал ставок
+                        local['accepted' if result.bid is not None else 'raised_max'] += 1
+                    except BidRejected as rejection:
+                        local[rejection.code] += 1
+                    except DatabaseError:
+                        local['db_error'] += 1
+            finally:
+                connection.close()
+                with lock:
+                    results.update(local)
+
+        threads = [threading.Thread(target=bidder_loop, args=(user,)) for user in bidders]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        attempts = sum(results.values())
+        self.stdout.write(f'Lot {lot.pk}: {options["threads"]} threads, {attempts} attempts in {elapsed:.2f}s')
+        for outcome, count in sorted(results.items()):
+            self.stdout.write(f'  {outcome}: {count}')
+        self.stdout.write(self.style.SUCCESS(f'{results["accepted"] / elapsed:.1f} accepted bids/s, '
+                                             f'{attempts / elapsed:.1f} attempts/s'))
+
+        lot.refresh_from_db()
+        ledger = lot.bids.count()
+        if ledger != lot.bids_num or ledger != results['accepted']:
+            raise CommandError(f'Ledger mismatch: {ledger} bids, counter {lot.bids_num}, accepted {results["accepted"]}')
+        if not options['lot'] and not options['keep']:
+            lot.delete()
+
+    def get_lot(self, lot_id):
+        if lot_id:
+            return Lot.objects.get(pk=lot_id)
+        product = Product.objects.order_by('pk').first()
+        if product is None:
+            raise CommandError('No products to create a lot for')
+        return Lot.objects.create(product=product, start_price=product.price, current_price=product.price)
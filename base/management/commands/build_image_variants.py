@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from base.images import build_variants
+from base.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Строит уменьшенные копии изображений товаров, у которых их еще нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Пересоздать копии для всех товаров')
+
+    def handle(self, *args, **options):
+        # Изображение по умолчанию лежит в статике, а не в хранилище загрузок
+        default = Product._meta.get_field('picture').default
+        products = Product.objects.exclude(picture__in=['', default]).only('picture')
+        if not options['all']:
+            products = products.filter(picture_variants={})
+
+        built = failed = 0
+        for product in products.iterator():
+            try:
+                build_variants(product.pk, product.picture.name)
+                built += 1
+            except (OSError, ValueError) as error:
+                failed += 1
+                self.stderr.write(f'Product {product.pk}: {error}')
+        self.stdout.write(self.style.SUCCESS(f'Built image variants for {built} products, {failed} failed'))
@@ -0,0 +1,90 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from base.models import Order, Product, Review
+
+
+# GET-эндпоинты, запросы которых воспроизводятся через тестовый клиент. {product} - id существующего товара
+VIEW_URLS = [
+    ('get_products', '/api/products/'),
+    ('get_products: page 2', '/api/products/?page=2'),
+    ('get_products: with reviews', '/api/products/?expand=reviews'),
+    ('get_products: search', '/api/products/?keyword=a'),
+    ('get_products: cursor by created_at', '/api/products/?paginate=cursor'),
+    ('get_products: cursor by rating', '/api/products/?paginate=cursor&ordering=rating'),
+    ('get_top_products', '/api/products/top/'),
+    ('get_product', '/api/products/{product}/'),
+]
+
+# Запросы на запись и фильтры, которые нельзя вызвать GET-запросом
+ORM_QUERIES = [
+    ('add_product_review: duplicate check', lambda: Review.objects.filter(to_product_id=1, reviewer_id=1)),
+    ('orders of customer', lambda: Order.objects.filter(customer_id=1).order_by('-created_at')),
+    ('products of category by price', lambda: Product.objects.filter(category_id=1).order_by('price')),
+]
+
+
+def is_full_scan(line: str) -> bool:
+    if connection.vendor == 'sqlite':
+        # "SCAN table" без индекса; виртуальная таблица FTS5 сканируется через свой индекс
+        return line.startswith('SCAN ') and 'USING' not in line and 'VIRTUAL TABLE' not in line
+    return 'Seq Scan' in line
+
+
+class Command(BaseCommand):
+    help = 'Воспроизводит запросы представлений, выводит их планы выполнения и отмечает полные сканирования таблиц'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fail-on-scan', action='store_true',
+                            help='Завершиться с ошибкой, если найдено полное сканирование таблицы')
+        parser.add_argument('--verbose-plans', action='store_true', help='Выводить планы всех запросов')
+
+    def handle(self, *args, **options):
+        queries = self.collect_view_queries() + [
+            (name, *queryset().query.sql_with_params()) for name, queryset in ORM_QUERIES
+        ]
+
+        flagged = 0
+        for name, sql, params in queries:
+            plan = self.explain(sql, params)
+            scans = [line for line in plan if is_full_scan(line)]
+            if scans:
+                flagged += 1
+                self.stdout.write(self.style.WARNING(f'[FULL SCAN] {name}'))
+                self.stdout.write(f'    {sql[:300]}')
+            elif options['verbose_plans']:
+                self.stdout.write(self.style.SUCCESS(f'[OK] {name}'))
+            if scans or options['verbose_plans']:
+                for line in plan:
+                    self.stdout.write(f'    | {line}')
+
+        summary = f'{len(queries)} queries explained, {flagged} with full table scans'
+        if flagged and options['fail_on_scan']:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary) if not flagged else self.style.WARNING(summary))
+
+    def collect_view_queries(self) -> list:
+        product = Product.objects.order_by('pk').values_list('pk', flat=True).first() or 1
+        client = Client(raise_request_exception=False)
+        queries = []
+        # Кэш ответов отключается, иначе представления не будут выполнены
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+                               ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], QUERY_BUDGET_STRICT=False):
+            for name, url in VIEW_URLS:
+                with CaptureQueriesContext(connection) as context:
+                    client.get(url.format(product=product))
+                queries += [(f'{name} #{number}', query['sql'], None)
+                            for number, query in enumerate(context.captured_queries, start=1)
+                            if query['sql'].lstrip().upper().startswith('SELECT')]
+        return queries
+
+    def explain(self, sql: str, params) -> list:
+        prefix = connection.ops.explain_query_prefix()
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            rows = cursor.fetchall()
+        # В SQLite последняя колонка EXPLAIN QUERY PLAN - текст шага плана
+        return [str(row[-1]) for row in rows]
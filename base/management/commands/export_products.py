@@ -0,0 +1,24 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from base.catalog_io import export_products
+from base.management.commands.import_products import detect_format
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает товары в CSV или JSONL (- для stdout) в формате, который принимает import_products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=('csv', 'jsonl'), default='')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if path == '-':
+            export_products(sys.stdout, options['format'] or 'jsonl')
+            return
+
+        with open(path, 'w', encoding='utf-8', newline='') as stream:
+            exported = export_products(stream, detect_format(path, options['format']))
+        self.stdout.write(self.style.SUCCESS(f'{exported} products exported to {path}'))
@@ -0,0 +1,62 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from base.cache import CATALOG_SCOPE, invalidate
+from base.catalog_io import CategoryResolver, ImportRowError, import_products, read_rows
+from base.categories import rebuild_product_counts
+
+
+def detect_format(path: str, file_format: str) -> str:
+    if file_format:
+        return file_format
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in ('.csv', '.jsonl'):
+        raise CommandError('Cannot detect the file format, pass --format')
+    return extension[1:]
+
+
+class Command(BaseCommand):
+    help = ('Потоково импортирует товары из CSV или JSONL (- для stdin). '
+            'Каждая порция строк вставляется в отдельной транзакции')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=('csv', 'jsonl'), default='')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Строк в одной транзакции')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Строк в одном INSERT')
+        parser.add_argument('--create-categories', action='store_true',
+                            help='Создавать категории, которых нет в дереве')
+        parser.add_argument('--skip-invalid', action='store_true',
+                            help='Пропускать некорректные строки вместо остановки импорта')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = detect_format(path, options['format']) if path != '-' else options['format'] or 'jsonl'
+        categories = CategoryResolver(create=options['create_categories'])
+
+        def progress(created):
+            self.stdout.write(f'{created} products imported...')
+
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8', newline='')
+        try:
+            created, errors = import_products(read_rows(stream, file_format), categories,
+                                              chunk_size=options['chunk_size'], batch_size=options['batch_size'],
+                                              skip_invalid=options['skip_invalid'], on_chunk=progress)
+        except ImportRowError as error:
+            # Уже закоммиченные порции остаются в базе, счетчики и кэш обновляются и в этом случае
+            self.finish()
+            raise CommandError(f'Import stopped at {error}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.finish()
+        for error in errors:
+            self.stderr.write(f'Skipped {error}')
+        self.stdout.write(self.style.SUCCESS(f'{created} products imported, {len(errors)} rows skipped'))
+
+    def finish(self):
+        rebuild_product_counts()
+        invalidate(CATALOG_SCOPE)
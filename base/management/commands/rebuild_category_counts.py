@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from base.categories import rebuild_product_counts
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает количество товаров в категориях (например, после перемещения веток дерева)'
+
+    def handle(self, *args, **options):
+        count = rebuild_product_counts()
+        self.stdout.write(self.style.SUCCESS(f'Product counts rebuilt for {count} categories'))
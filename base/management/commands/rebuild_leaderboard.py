@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from base.leaderboard import rebuild_leaderboard
+
+
+class Command(BaseCommand):
+    help = 'Заново заполняет витрину лучших товаров'
+
+    def handle(self, *args, **options):
+        count = rebuild_leaderboard()
+        self.stdout.write(self.style.SUCCESS(f'Leaderboard rebuilt with {count} products'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from base.aggregates import rebuild_review_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает количество отзывов и рейтинг всех товаров'
+
+    def handle(self, *args, **options):
+        updated = rebuild_review_aggregates()
+        self.stdout.write(self.style.SUCCESS(f'Review aggregates rebuilt for {updated} products'))
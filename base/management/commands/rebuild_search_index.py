@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from base.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Полностью перестраивает поисковый индекс товаров'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        with transaction.atomic():
+            backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Search index rebuilt ({type(backend).__name__})'))
@@ -0,0 +1,64 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from base.jobs import purge_finished, requeue_stale, run_pending
+
+
+# Как часто обработчик возвращает в очередь зависшие задачи и удаляет старые выполненные, сек
+MAINTENANCE_INTERVAL = 300
+
+
+class Command(BaseCommand):
+    help = 'Обработчик очереди фоновых задач: без --once опрашивает очередь, пока его не остановят'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Выполнить готовые задачи и завершиться')
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'JOB_BATCH_SIZE', 20),
+                            help='Сколько задач выполнить между проверками сигнала остановки и обслуживанием очереди')
+        parser.add_argument('--interval', type=float, default=getattr(settings, 'JOB_POLL_INTERVAL', 1),
+                            help='Пауза между опросами пустой очереди, сек')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            requeue_stale()
+            count = processed = run_pending(options['batch_size'])
+            while processed == options['batch_size']:
+                processed = run_pending(options['batch_size'])
+                count += processed
+            self.stdout.write(self.style.SUCCESS(f'{count} jobs processed'))
+            return
+
+        stopping = []
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stopping.append(True))
+
+        self.stdout.write(f'Polling the job queue every {options["interval"]}s, press Ctrl+C to stop')
+        maintained = None
+        while not stopping:
+            close_old_connections()
+            try:
+                if maintained is None or time.monotonic() - maintained > MAINTENANCE_INTERVAL:
+                    requeue_stale()
+                    purge_finished()
+                    maintained = time.monotonic()
+                count = run_pending(options['batch_size'])
+                if count:
+                    self.stdout.write(f'{count} jobs processed')
+                if count == options['batch_size']:
+                    # В очереди еще есть задачи: пауза не нужна
+                    continue
+            except DatabaseError as error:
+                self.stderr.write(f'Job queue is unavailable, will retry: {error}')
+            self.sleep(options['interval'], stopping)
+        self.stdout.write('Stopped')
+
+    @staticmethod
+    def sleep(seconds: float, stopping: list) -> None:
+        # Короткие паузы, чтобы сигнал остановки обрабатывался без ожидания всего интервала
+        until = time.monotonic() + seconds
+        while not stopping and time.monotonic() < until:
+            time.sleep(min(0.5, until - time.monotonic()))
@@ -0,0 +1,55 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+
+from base.settlement import next_deadline, settle_expired_lots
+
+
+class Command(BaseCommand):
+    help = 'Закрывает торги по лотам с истекшим сроком: без --once работает как постоянный обработчик'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Закрыть истекшие лоты и завершиться')
+        parser.add_argument('--batch-size', type=int, default=getattr(settings, 'AUCTION_SETTLE_BATCH_SIZE', 500))
+        parser.add_argument('--interval', type=float, default=getattr(settings, 'AUCTION_SETTLE_INTERVAL', 5),
+                            help='Наибольшая пауза между проверками, сек')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            count = settle_expired_lots(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'{count} lots settled'))
+            return
+
+        stopping = []
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stopping.append(True))
+
+        self.stdout.write(f'Settling expired lots every {options["interval"]}s, press Ctrl+C to stop')
+        while not stopping:
+            close_old_connections()
+            try:
+                count = settle_expired_lots(batch_size=options['batch_size'])
+                if count:
+                    self.stdout.write(f'{count} lots settled')
+                # Спим до ближайшего окончания торгов, но не дольше interval: лоты могут добавиться
+                deadline = next_deadline()
+            except DatabaseError as error:
+                # Пачка откатилась целиком, ее лоты закроются при следующей попытке
+                self.stderr.write(f'Settlement failed, will retry: {error}')
+                deadline = None
+            pause = options['interval']
+            if deadline is not None:
+                pause = min(max((deadline - timezone.now()).total_seconds(), 0), pause)
+            self.sleep(pause, stopping)
+        self.stdout.write('Stopped')
+
+    @staticmethod
+    def sleep(seconds: float, stopping: list) -> None:
+        # Короткие паузы, чтобы сигнал остановки обрабатывался без ожидания всего интервала
+        until = time.monotonic() + seconds
+        while not stopping and time.monotonic() < until:
+            time.sleep(min(0.5, until - time.monotonic()))
@@ -0,0 +1,138 @@
+import contextvars
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from django.conf import settings
+
+
+# Процентили, которые отдает сводка по эндпоинтам
+PERCENTILES = (50, 95, 99)
+
+
+class RequestMetrics:
+    """Замеры одного запроса: время в БД, число запросов и время по именованным этапам (мс)"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.timings: Dict[str, float] = defaultdict(float)
+        self._depth: Dict[str, int] = defaultdict(int)
+
+    def elapsed(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+
+_current: contextvars.ContextVar[Optional[RequestMetrics]] = contextvars.ContextVar('request_metrics', default=None)
+
+
+def current_metrics() -> Optional[RequestMetrics]:
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    """Обертка connection.execute_wrapper: учитывает запрос в метриках текущего запроса.
+
+    Устанавливается на каждое соединение при подключении (base.signals), поэтому запросы
+    асинхронных представлений, выполняемые ORM в отдельном потоке, тоже учитываются:
+    контекст с метриками копируется в поток через sync_to_async.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += (time.perf_counter() - started) * 1000
+
+
+def start_request() -> RequestMetrics:
+    metrics = RequestMetrics()
+    _current.set(metrics)
+    return metrics
+
+
+def finish_request() -> None:
+    _current.set(None)
+
+
+@contextmanager
+def measure(name: str):
+    """Добавляет время выполнения блока к этапу name текущего запроса.
+
+    Вложенные блоки с тем же именем (например, сериализатор внутри сериализатора) не учитываются повторно.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+
+    metrics._depth[name] += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics._depth[name] -= 1
+        if not metrics._depth[name]:
+            metrics.timings[name] += (time.perf_counter() - started) * 1000
+
+
+class EndpointStats:
+    """Скользящее окно последних замеров эндпоинта"""
+
+    def __init__(self, window: int):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+
+    def add(self, duration: float, metrics: RequestMetrics) -> None:
+        self.samples.append((duration, metrics.queries, metrics.db_time, dict(metrics.timings)))
+        self.count += 1
+
+    def summary(self) -> dict:
+        window = len(self.samples)
+        result = {'count': self.count, 'window': window}
+        if not window:
+            return result
+
+        durations = sorted(sample[0] for sample in self.samples)
+        for percentile in PERCENTILES:
+            # Процентиль по методу ближайшего ранга
+            rank = max(-(-percentile * window // 100) - 1, 0)
+            result[f'p{percentile}_ms'] = round(durations[rank], 2)
+        result['avg_queries'] = round(sum(sample[1] for sample in self.samples) / window, 2)
+        result['avg_db_ms'] = round(sum(sample[2] for sample in self.samples) / window, 2)
+        stages = {name for sample in self.samples for name in sample[3]}
+        for name in sorted(stages):
+            result[f'avg_{name}_ms'] = round(sum(sample[3].get(name, 0) for sample in self.samples) / window, 2)
+        return result
+
+
+class EndpointRegistry:
+    """Статистика по эндпоинтам в памяти процесса. У каждого воркера сервера она своя"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, EndpointStats] = {}
+
+    def record(self, endpoint: str, duration: float, metrics: RequestMetrics) -> None:
+        with self._lock:
+            stats = self._stats.get(endpoint)
+            if stats is None:
+                stats = self._stats[endpoint] = EndpointStats(getattr(settings, 'PERFORMANCE_WINDOW', 1000))
+            stats.add(duration, metrics)
+
+    def summary(self) -> Dict[str, dict]:
+        with self._lock:
+            return {endpoint: stats.summary() for endpoint, stats in sorted(self._stats.items())}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+registry = EndpointRegistry()
@@ -0,0 +1,113 @@
+import cProfile
+import io
+import logging
+import pstats
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from base.metrics import current_metrics, finish_request, registry, start_request
+
+
+logger = logging.getLogger(__name__)
+
+
+def log_profile(request, profile: cProfile.Profile, duration: float) -> None:
+    """Обработчик профиля по умолчанию: пишет в лог самые затратные по суммарному времени функции"""
+    output = io.StringIO()
+    pstats.Stats(profile, stream=output).sort_stats('cumulative').print_stats(25)
+    logger.info('Profile of %s %s (%.1f ms)\n%s', request.method, request.path, duration, output.getvalue())
+
+
+class PerformanceMiddleware:
+    """Замеряет время обработки запросов к представлениям base.views.
+
+    Работает и с синхронными, и с асинхронными представлениями.
+    Для каждого запроса считает общее время, число и время SQL-запросов, время сериализации
+    (base.metrics.measure) и рендеринга ответа. Копит скользящую статистику по эндпоинтам
+    (base.metrics.registry), при PERFORMANCE_SERVER_TIMING (по умолчанию - только в отладке)
+    отдает замеры в заголовке Server-Timing. С вероятностью
+    PERFORMANCE_PROFILE_RATE запрос выполняется под cProfile, профиль передается
+    обработчику PERFORMANCE_PROFILE_HOOK.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.modules = tuple(getattr(settings, 'PERFORMANCE_MODULES', ('base.views',)))
+        self.profile_rate = getattr(settings, 'PERFORMANCE_PROFILE_RATE', 0)
+        hook = getattr(settings, 'PERFORMANCE_PROFILE_HOOK', None)
+        self.profile_hook = import_string(hook) if hook else log_profile
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        metrics, profile = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            self.stop(profile)
+        return self.finish(request, response, metrics, profile)
+
+    async def __acall__(self, request):
+        metrics, profile = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.stop(profile)
+        return self.finish(request, response, metrics, profile)
+
+    def start(self):
+        metrics = start_request()
+        profile = None
+        if self.profile_rate and random.random() < self.profile_rate:
+            profile = cProfile.Profile()
+            profile.enable()
+        return metrics, profile
+
+    @staticmethod
+    def stop(profile) -> None:
+        if profile is not None:
+            profile.disable()
+        finish_request()
+
+    def finish(self, request, response, metrics, profile):
+        endpoint = self.endpoint(request)
+        if endpoint is None:
+            return response
+
+        duration = metrics.elapsed()
+        registry.record(endpoint, duration, metrics)
+        if getattr(settings, 'PERFORMANCE_SERVER_TIMING', settings.DEBUG):
+            timings = [f'app;dur={duration:.1f}', f'db;dur={metrics.db_time:.1f};desc="{metrics.queries} queries"']
+            timings += [f'{name};dur={value:.1f}' for name, value in metrics.timings.items()]
+            response['Server-Timing'] = ', '.join(timings)
+        if profile is not None:
+            self.profile_hook(request, profile, duration)
+        return response
+
+    def process_template_response(self, request, response):
+        # Ответы DRF рендерятся после представления: время рендеринга учитывается отдельным этапом
+        metrics = current_metrics()
+        if metrics is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                metrics.timings['render'] += (time.perf_counter() - started) * 1000
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def endpoint(self, request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None or not getattr(match.func, '__module__', '').startswith(self.modules):
+            return None
+        return match.view_name
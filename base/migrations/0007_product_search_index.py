@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+FTS_TABLE = 'base_product_fts'
+
+
+def create_search_index(apps, schema_editor):
+    # Полнотекстовый индекс FTS5 есть только в SQLite, для остальных СУБД используется запасной бэкенд
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                          f"title, vendor, description, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')")
+    schema_editor.execute(f'INSERT INTO {FTS_TABLE} (rowid, title, vendor, description) '
+                          f'SELECT id, title, vendor, description FROM base_product')
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0006_deliveryaddress'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.1 on 2026-10-18 10:34
+
+from django.db import migrations, models
+from django.db.models import IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_rating_sum(apps, schema_editor):
+    Product = apps.get_model('base', 'Product')
+    Review = apps.get_model('base', 'Review')
+    rating_sum = (Review.objects.filter(to_product=OuterRef('pk')).order_by().values('to_product')
+                  .annotate(value=Sum('rating')).values('value'))
+    Product.objects.update(rating_sum=Coalesce(Subquery(rating_sum, output_field=IntegerField()), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0007_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Сумма оценок'),
+        ),
+        migrations.RunPython(fill_rating_sum, migrations.RunPython.noop),
+    ]
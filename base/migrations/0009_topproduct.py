@@ -0,0 +1,36 @@
+# Generated by Django 4.2.1 on 2026-10-18 10:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.conf import settings
+
+
+def fill_leaderboard(apps, schema_editor):
+    Product = apps.get_model('base', 'Product')
+    TopProduct = apps.get_model('base', 'TopProduct')
+    products = Product.objects.filter(rating__gte=settings.TOP_PRODUCTS['FLOOR_RATING']).values_list('pk', 'rating')
+    TopProduct.objects.bulk_create([TopProduct(product_id=pk, rating=rating) for pk, rating in products],
+                                   batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0008_product_rating_sum'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopProduct',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='top_entry', serialize=False, to='base.product', verbose_name='Товар')),
+                ('rating', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Рейтинг')),
+            ],
+            options={
+                'verbose_name': 'Лучший товар',
+                'verbose_name_plural': 'Лучшие товары',
+                'indexes': [models.Index(fields=['-rating'], name='base_topproduct_rating_idx')],
+            },
+        ),
+        migrations.RunPython(fill_leaderboard, migrations.RunPython.noop),
+    ]
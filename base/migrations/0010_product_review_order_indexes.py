@@ -0,0 +1,45 @@
+# Generated by Django 4.2.1 on 2026-10-18 10:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0009_topproduct'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='topproduct',
+            name='base_topproduct_rating_idx',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer', 'created_at'], name='base_order_customer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['stock_quantity'], name='base_product_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['rating', 'id'], name='base_product_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['created_at', 'id'], name='base_product_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'price'], name='base_product_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['to_product', 'reviewer'], name='base_review_reviewer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='topproduct',
+            index=models.Index(fields=['-rating', '-product'], name='base_topproduct_rank_idx'),
+        ),
+    ]
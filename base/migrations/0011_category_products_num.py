@@ -0,0 +1,39 @@
+# Generated by Django 4.2.1 on 2026-10-18 10:37
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_products_num(apps, schema_editor):
+    Category = apps.get_model('base', 'Category')
+    Product = apps.get_model('base', 'Product')
+    steplen = 4
+    direct = dict(Product.objects.order_by().values_list('category').annotate(num=Count('id')))
+    categories = list(Category.objects.all())
+    paths = {category.pk: category.path for category in categories}
+    totals = Counter()
+    for category_id, num in direct.items():
+        path = paths[category_id]
+        for end in range(steplen, len(path) + 1, steplen):
+            totals[path[:end]] += num
+    for category in categories:
+        category.products_num = totals[category.path]
+    Category.objects.bulk_update(categories, ['products_num'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0010_product_review_order_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='products_num',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество товаров в категории и подкатегориях'),
+        ),
+        migrations.RunPython(fill_products_num, migrations.RunPython.noop),
+    ]
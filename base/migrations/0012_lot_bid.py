@@ -0,0 +1,54 @@
+# Generated by Django 4.2.1 on 2026-10-18 10:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('base', '0011_category_products_num'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Lot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_price', models.DecimalField(decimal_places=2, max_digits=8, verbose_name='Стартовая цена')),
+                ('current_price', models.DecimalField(decimal_places=2, max_digits=8, verbose_name='Текущая цена')),
+                ('min_step', models.DecimalField(decimal_places=2, default=1, max_digits=8, verbose_name='Минимальный шаг ставки')),
+                ('bids_num', models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество ставок')),
+                ('version', models.PositiveIntegerField(default=0, editable=False, verbose_name='Версия')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Торги идут')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+                ('leader', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='leading_lots', related_query_name='leading_lot', to=settings.AUTH_USER_MODEL, verbose_name='Лидер торгов')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lots', related_query_name='lot', to='base.product', verbose_name='Товар')),
+            ],
+            options={
+                'verbose_name': 'Лот',
+                'verbose_name_plural': 'Лоты',
+            },
+        ),
+        migrations.CreateModel(
+            name='Bid',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=8, verbose_name='Сумма')),
+                ('lot_version', models.PositiveIntegerField(verbose_name='Версия лота после ставки')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Сделана')),
+                ('bidder', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bids', related_query_name='bid', to=settings.AUTH_USER_MODEL, verbose_name='Участник')),
+                ('lot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bids', related_query_name='bid', to='base.lot', verbose_name='Лот')),
+            ],
+            options={
+                'verbose_name': 'Ставка',
+                'verbose_name_plural': 'Ставки',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='bid',
+            constraint=models.UniqueConstraint(fields=('lot', 'lot_version'), name='base_bid_lot_version_unique'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.1 on 2026-10-18 10:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('base', '0012_lot_bid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CartItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveSmallIntegerField(default=1, verbose_name='Количество')),
+                ('added_at', models.DateTimeField(auto_now_add=True, verbose_name='Добавлен')),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_items', related_query_name='cart_item', to=settings.AUTH_USER_MODEL, verbose_name='Покупатель')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_items', related_query_name='cart_item', to='base.product', verbose_name='Товар')),
+            ],
+            options={
+                'verbose_name': 'Позиция корзины',
+                'verbose_name_plural': 'Позиции корзин',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('customer', 'product'), name='base_cartitem_unique'),
+        ),
+    ]
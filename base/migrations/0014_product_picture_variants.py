@@ -0,0 +1,18 @@
+# Generated by Django 4.2.1 on 2026-10-18 10:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0013_cartitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='picture_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Уменьшенные копии изображения'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.1 on 2026-10-18 10:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0014_product_picture_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lot',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Торги закрыты'),
+        ),
+        migrations.AddField(
+            model_name='lot',
+            name='ends_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Окончание торгов'),
+        ),
+        migrations.AddField(
+            model_name='lot',
+            name='order',
+            field=models.OneToOneField(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lot', to='base.order', verbose_name='Заказ победителя'),
+        ),
+        migrations.AddIndex(
+            model_name='lot',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['ends_at'], name='base_lot_open_ends_at'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.1 on 2026-10-18 11:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('base', '0015_lot_ends_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lot',
+            name='leader_max',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=8, null=True, verbose_name='Максимальная ставка лидера'),
+        ),
+        migrations.CreateModel(
+            name='ProxyBid',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('max_amount', models.DecimalField(decimal_places=2, max_digits=8, verbose_name='Максимальная сумма')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Изменена')),
+                ('bidder', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='proxy_bids', related_query_name='proxy_bid', to=settings.AUTH_USER_MODEL, verbose_name='Участник')),
+                ('lot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='proxy_bids', related_query_name='proxy_bid', to='base.lot', verbose_name='Лот')),
+            ],
+            options={
+                'verbose_name': 'Автоставка',
+                'verbose_name_plural': 'Автоставки',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='proxybid',
+            constraint=models.UniqueConstraint(fields=('lot', 'bidder'), name='base_proxybid_lot_bidder_unique'),
+        ),
+    ]
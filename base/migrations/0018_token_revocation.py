@@ -0,0 +1,27 @@
+# Generated by Django 4.2.1 on 2026-10-18 11:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('base', '0017_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenRevocation',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='token_revocation', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('changed_at', models.PositiveBigIntegerField(verbose_name='Изменен (unix time, сек)')),
+            ],
+            options={
+                'verbose_name': 'Отзыв токенов',
+                'verbose_name_plural': 'Отзывы токенов',
+            },
+        ),
+    ]
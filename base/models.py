@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 from treebeard.mp_tree import MP_Node
 
@@ -7,6 +8,8 @@ from treebeard.mp_tree import MP_Node
 class Category(MP_Node):
     """Категория товаров. Организовано в виде дерева с родительскими и дочерними категориями"""
     name = models.CharField(verbose_name='Название категории', max_length=50)
+    products_num = models.PositiveIntegerField(verbose_name='Количество товаров в категории и подкатегориях',
+                                               default=0, editable=False)
 
     node_order_by = ('name',)
 
@@ -23,11 +26,14 @@ class Product(models.Model):
     title = models.CharField(verbose_name='Наименование', max_length=200)
     picture = models.ImageField(verbose_name='Изображение товара', blank=True, default="/img/default_prod_img.png",
                                 upload_to="img")
+    picture_variants = models.JSONField(verbose_name='Уменьшенные копии изображения', default=dict, blank=True,
+                                        editable=False)
     price = models.DecimalField(verbose_name='Цена', max_digits=8, decimal_places=2)
     description = models.TextField(verbose_name='Описание', blank=True, default='')
     vendor = models.CharField(verbose_name='Производитель', max_length=200, blank=True, default='')
     rating = models.DecimalField(verbose_name='Рейтинг', max_digits=12, decimal_places=2, default=0)
     reviews_num = models.PositiveSmallIntegerField(verbose_name='Количество отзывов', default=0)
+    rating_sum = models.PositiveIntegerField(verbose_name='Сумма оценок', default=0, editable=False)
     stock_quantity = models.PositiveSmallIntegerField(verbose_name='Количество на складе', default=0)
     created_at = models.DateTimeField(verbose_name='Создан', auto_now_add=True)
     # offer_id = models.BigAutoField(primary_key=True, editable=False)
@@ -40,11 +46,32 @@ class Product(models.Model):
     class Meta:
         verbose_name = 'Товар'
         verbose_name_plural = 'Товары'
+        indexes = [
+            models.Index(fields=['stock_quantity'], name='base_product_stock_idx'),
+            models.Index(fields=['rating', 'id'], name='base_product_rating_idx'),
+            models.Index(fields=['created_at', 'id'], name='base_product_created_idx'),
+            models.Index(fields=['category', 'price'], name='base_product_category_idx'),
+        ]
 
     def __str__(self):
         return f'{self.title} | {self.vendor} | {self.price}'
 
 
+class TopProduct(models.Model):
+    """Запись витрины лучших товаров. Хранит только товары с рейтингом не ниже порога витрины"""
+    product = models.OneToOneField(verbose_name='Товар', to=Product, on_delete=models.CASCADE, primary_key=True,
+                                   related_name='top_entry')
+    rating = models.DecimalField(verbose_name='Рейтинг', max_digits=12, decimal_places=2)
+
+    class Meta:
+        verbose_name = 'Лучший товар'
+        verbose_name_plural = 'Лучшие товары'
+        indexes = [models.Index(fields=['-rating', '-product'], name='base_topproduct_rank_idx')]
+
+    def __str__(self):
+        return f'{self.product_id} | {self.rating}'
+
+
 class Review(models.Model):
     """Класс отзыва"""
     title = models.CharField(verbose_name='Заголовок', max_length=200, blank=True, default='')
@@ -60,6 +87,7 @@ class Review(models.Model):
     class Meta:
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
+        indexes = [models.Index(fields=['to_product', 'reviewer'], name='base_review_reviewer_idx')]
 
     def __str__(self):
         return str(self.rating)
@@ -82,6 +110,7 @@ class Order(models.Model):
     class Meta:
         verbose_name = 'Заказ'
         verbose_name_plural = 'Заказы'
+        indexes = [models.Index(fields=['customer', 'created_at'], name='base_order_customer_idx')]
 
     def __str__(self):
         return str(self.created_at)
@@ -124,3 +153,142 @@ class DeliveryAddress(models.Model):
 
     def __str__(self):
         return str(self.address)
+
+
+class Lot(models.Model):
+    """Класс лота аукциона"""
+    product = models.ForeignKey(verbose_name='Товар', to=Product, on_delete=models.CASCADE, related_name='lots',
+                                related_query_name='lot')
+    start_price = models.DecimalField(verbose_name='Стартовая цена', max_digits=8, decimal_places=2)
+    current_price = models.DecimalField(verbose_name='Текущая цена', max_digits=8, decimal_places=2)
+    min_step = models.DecimalField(verbose_name='Минимальный шаг ставки', max_digits=8, decimal_places=2, default=1)
+    leader = models.ForeignKey(verbose_name='Лидер торгов', to=User, on_delete=models.SET_NULL, null=True, blank=True,
+                               related_name='leading_lots', related_query_name='leading_lot')
+    bids_num = models.PositiveIntegerField(verbose_name='Количество ставок', default=0, editable=False)
+    # Автоставка лидера (base.auction): вторая по величине автоставка уже отражена в текущей цене. Не отдается в API
+    leader_max = models.DecimalField(verbose_name='Максимальная ставка лидера', max_digits=8, decimal_places=2,
+                                     null=True, blank=True, editable=False)
+    # Версия для оптимистической блокировки: увеличивается с каждой принятой ставкой
+    version = models.PositiveIntegerField(verbose_name='Версия', default=0, editable=False)
+    is_active = models.BooleanField(verbose_name='Торги идут', default=True)
+    created_at = models.DateTimeField(verbose_name='Создан', auto_now_add=True)
+    ends_at = models.DateTimeField(verbose_name='Окончание торгов', null=True, blank=True)
+    closed_at = models.DateTimeField(verbose_name='Торги закрыты', null=True, blank=True, editable=False)
+    # Заказ победителя, созданный при закрытии торгов (base.settlement)
+    order = models.OneToOneField(verbose_name='Заказ победителя', to='Order', on_delete=models.SET_NULL, null=True,
+                                 blank=True, editable=False, related_name='lot')
+
+    class Meta:
+        verbose_name = 'Лот'
+        verbose_name_plural = 'Лоты'
+        # Очередь закрытия: только идущие торги, упорядоченные по времени окончания
+        indexes = [models.Index(fields=['ends_at'], condition=models.Q(is_active=True), name='base_lot_open_ends_at')]
+
+    def __str__(self):
+        return f'{self.product_id} | {self.current_price}'
+
+
+class ProxyBid(models.Model):
+    """Класс автоставки: сумма, до которой участник готов повышать цену лота. Одна запись на участника и лот"""
+    lot = models.ForeignKey(verbose_name='Лот', to=Lot, on_delete=models.CASCADE, related_name='proxy_bids',
+                            related_query_name='proxy_bid')
+    bidder = models.ForeignKey(verbose_name='Участник', to=User, on_delete=models.CASCADE, related_name='proxy_bids',
+                               related_query_name='proxy_bid')
+    max_amount = models.DecimalField(verbose_name='Максимальная сумма', max_digits=8, decimal_places=2)
+    updated_at = models.DateTimeField(verbose_name='Изменена', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Автоставка'
+        verbose_name_plural = 'Автоставки'
+        constraints = [models.UniqueConstraint(fields=['lot', 'bidder'], name='base_proxybid_lot_bidder_unique')]
+
+    def __str__(self):
+        return f'{self.lot_id} | {self.bidder_id} | {self.max_amount}'
+
+
+class Bid(models.Model):
+    """Класс ставки. Журнал ставок только дополняется, существующие записи не изменяются"""
+    lot = models.ForeignKey(verbose_name='Лот', to=Lot, on_delete=models.CASCADE, related_name='bids',
+                            related_query_name='bid')
+    bidder = models.ForeignKey(verbose_name='Участник', to=User, on_delete=models.SET_NULL, null=True,
+                               related_name='bids', related_query_name='bid')
+    amount = models.DecimalField(verbose_name='Сумма', max_digits=8, decimal_places=2)
+    lot_version = models.PositiveIntegerField(verbose_name='Версия лота после ставки')
+    created_at = models.DateTimeField(verbose_name='Сделана', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Ставка'
+        verbose_name_plural = 'Ставки'
+        constraints = [models.UniqueConstraint(fields=['lot', 'lot_version'], name='base_bid_lot_version_unique')]
+
+    def __str__(self):
+        return f'{self.lot_id} | {self.amount}'
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Bids are append-only and cannot be changed')
+        super().save(*args, **kwargs)
+
+
+class CartItem(models.Model):
+    """Класс позиции корзины пользователя"""
+    customer = models.ForeignKey(verbose_name='Покупатель', to=User, on_delete=models.CASCADE,
+                                 related_name='cart_items', related_query_name='cart_item')
+    product = models.ForeignKey(verbose_name='Товар', to=Product, on_delete=models.CASCADE,
+                                related_name='cart_items', related_query_name='cart_item')
+    quantity = models.PositiveSmallIntegerField(verbose_name='Количество', default=1)
+    added_at = models.DateTimeField(verbose_name='Добавлен', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Позиция корзины'
+        verbose_name_plural = 'Позиции корзин'
+        constraints = [models.UniqueConstraint(fields=['customer', 'product'], name='base_cartitem_unique')]
+
+    def __str__(self):
+        return f'{self.product_id} x {self.quantity}'
+
+
+class Job(models.Model):
+    """Класс фоновой задачи очереди base.jobs"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = [(QUEUED, 'В очереди'), (RUNNING, 'Выполняется'), (DONE, 'Выполнена'), (FAILED, 'Не выполнена')]
+
+    task = models.CharField(verbose_name='Функция задачи', max_length=200)
+    payload = models.JSONField(verbose_name='Аргументы', default=dict, blank=True)
+    # Задачи с большим приоритетом выполняются раньше
+    priority = models.SmallIntegerField(verbose_name='Приоритет', default=0)
+    status = models.CharField(verbose_name='Состояние', max_length=10, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(verbose_name='Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField(verbose_name='Наибольшее число попыток', default=3)
+    run_at = models.DateTimeField(verbose_name='Выполнить не раньше', default=timezone.now)
+    started_at = models.DateTimeField(verbose_name='Начата', null=True, blank=True)
+    finished_at = models.DateTimeField(verbose_name='Завершена', null=True, blank=True)
+    last_error = models.TextField(verbose_name='Последняя ошибка', blank=True, default='')
+    created_at = models.DateTimeField(verbose_name='Создана', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        # Очередь: только ожидающие задачи в порядке выборки обработчиком
+        indexes = [models.Index(fields=['-priority', 'run_at'], condition=models.Q(status='queued'),
+                                name='base_job_queue')]
+
+    def __str__(self):
+        return f'{self.task} | {self.status}'
+
+
+class TokenRevocation(models.Model):
+    """Класс отметки об изменении пользователя: его токены, выданные раньше changed_at, не берут данные из claims"""
+    user = models.OneToOneField(verbose_name='Пользователь', to=User, on_delete=models.CASCADE, primary_key=True,
+                                related_name='token_revocation')
+    changed_at = models.PositiveBigIntegerField(verbose_name='Изменен (unix time, сек)')
+
+    class Meta:
+        verbose_name = 'Отзыв токенов'
+        verbose_name_plural = 'Отзывы токенов'
+
+    def __str__(self):
+        return f'{self.user_id} | {self.changed_at}'
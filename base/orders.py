@@ -0,0 +1,89 @@
+from collections import Counter
+from decimal import Decimal
+from typing import Iterable, List, Tuple
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, When
+
+from base.cache import CATALOG_SCOPE, invalidate_on_commit, product_scope
+from base.live import publish_current
+from base.models import DeliveryAddress, Order, OrderItem, Product
+
+
+class OrderRejected(Exception):
+    """Заказ не может быть оформлен. unavailable - id товаров, которых нет или не хватает на складе"""
+
+    def __init__(self, detail: str, unavailable: Iterable[int] = ()):
+        super().__init__(detail)
+        self.detail = detail
+        self.unavailable = sorted(unavailable)
+
+
+def reserve_stock(quantities: Counter) -> None:
+    """Списывает остатки всех позиций одним условным UPDATE.
+
+    Строка обновляется, только если на складе хватает товара, поэтому одновременные заказы
+    не уводят остаток в минус; если обновились не все строки, транзакция откатывается.
+    """
+    enough = Q()
+    for pk, quantity in quantities.items():
+        enough |= Q(pk=pk, stock_quantity__gte=quantity)
+    remaining = Case(*[When(pk=pk, then=F('stock_quantity') - quantity) for pk, quantity in quantities.items()],
+                     default=F('stock_quantity'), output_field=IntegerField())
+
+    try:
+        with transaction.atomic():
+            if Product.objects.filter(enough).update(stock_quantity=remaining) != len(quantities):
+                raise OrderRejected('Not enough products in stock')
+            publish_current(Product, quantities, ['stock_quantity'])
+    except OrderRejected:
+        # Точка сохранения откатилась, остатки снова исходные: находим позиции, которых не хватило
+        stock = dict(Product.objects.filter(pk__in=quantities).values_list('pk', 'stock_quantity'))
+        raise OrderRejected('Not enough products in stock',
+                            [pk for pk, quantity in quantities.items() if stock.get(pk, 0) < quantity])
+
+
+def place_order(user: User, items: List[Tuple[int, int]], address: dict, payment_method: str = '',
+                tax: Decimal = Decimal(0), delivery_cost: Decimal = Decimal(0)) -> Order:
+    """Оформляет заказ в одной транзакции: товары читаются одним in_bulk,
+    позиции вставляются одним bulk_create, остатки списываются одним UPDATE"""
+    quantities = Counter()
+    for product_id, quantity in items:
+        if quantity <= 0:
+            raise OrderRejected('Quantity must be positive', [product_id])
+        quantities[product_id] += quantity
+
+    with transaction.atomic():
+        products = Product.objects.only('title', 'price').in_bulk(list(quantities))
+        missing = quantities.keys() - products.keys()
+        if missing:
+            raise OrderRejected('Some products do not exist', missing)
+
+        reserve_stock(quantities)
+
+        items_cost = sum(products[pk].price * quantity for pk, quantity in quantities.items())
+        order = Order.objects.create(
+            customer_id=user.pk,
+            payment_method=payment_method,
+            tax=tax,
+            delivery_cost=delivery_cost,
+            total_cost=items_cost + tax + delivery_cost,
+        )
+        DeliveryAddress.objects.create(
+            order=order,
+            address=address['address'],
+            city=address['city'],
+            postal_code=address.get('postalCode', ''),
+            country=address['country'],
+            delivery_cost=delivery_cost,
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_id=pk, title=products[pk].title, quantity=quantity,
+                      price=products[pk].price)
+            for pk, quantity in quantities.items()
+        ])
+
+        # Остатки изменены UPDATE-ом в обход сигналов, поэтому кэш каталога сбрасываем явно
+        invalidate_on_commit(CATALOG_SCOPE, *(product_scope(pk) for pk in quantities))
+    return order
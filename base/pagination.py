@@ -0,0 +1,99 @@
+import base64
+import binascii
+import json
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Optional, Tuple
+
+from django.db.models import Q, QuerySet
+
+
+# Поля, по которым допустима постраничная навигация по курсору. Второй ключ всегда id
+CURSOR_ORDERINGS = {
+    'created_at': datetime.fromisoformat,
+    'rating': Decimal,
+}
+
+CursorPage = namedtuple('CursorPage', ['items', 'next', 'previous'])
+
+
+class InvalidCursor(ValueError):
+    """Курсор поврежден или не соответствует выбранной сортировке"""
+
+
+def encode_cursor(ordering: str, obj, direction: str) -> str:
+    value = getattr(obj, ordering)
+    payload = {'o': ordering, 'v': value.isoformat() if isinstance(value, datetime) else str(value),
+               'id': obj.pk, 'd': direction}
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, ordering: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if payload['o'] != ordering or payload['d'] not in ('next', 'prev'):
+            raise InvalidCursor(cursor)
+        value = CURSOR_ORDERINGS[ordering](payload['v'])
+        return value, int(payload['id']), payload['d']
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError,
+            ValueError, InvalidOperation):
+        raise InvalidCursor(cursor)
+
+
+def paginate_by_cursor(queryset: QuerySet, ordering: str, cursor: Optional[str], page_size: int) -> CursorPage:
+    """Keyset-пагинация по паре (ordering, id) по убыванию.
+
+    В отличие от Paginator не выполняет COUNT(*) и не сканирует пропущенные строки через OFFSET:
+    каждая страница - это выборка по индексу начиная с позиции, зашитой в курсор.
+    """
+    queryset, pk, direction = cursor_queryset(queryset, ordering, cursor)
+    # Берем на один элемент больше, чтобы понять, есть ли следующая страница, без подсчета строк
+    return cursor_page(list(queryset[:page_size + 1]), ordering, pk, direction, page_size)
+
+
+async def apaginate_by_cursor(queryset: QuerySet, ordering: str, cursor: Optional[str], page_size: int) -> CursorPage:
+    """paginate_by_cursor для асинхронных представлений"""
+    queryset, pk, direction = cursor_queryset(queryset, ordering, cursor)
+    return cursor_page([obj async for obj in queryset[:page_size + 1]], ordering, pk, direction, page_size)
+
+
+def cursor_queryset(queryset: QuerySet, ordering: str, cursor: Optional[str]) -> Tuple[QuerySet, Optional[int], str]:
+    """Выборка страницы по курсору (без выполнения) и направление движения"""
+    if ordering not in CURSOR_ORDERINGS:
+        raise InvalidCursor(ordering)
+
+    if cursor:
+        value, pk, direction = decode_cursor(cursor, ordering)
+    else:
+        value, pk, direction = None, None, 'next'
+
+    if direction == 'next':
+        queryset = queryset.order_by(f'-{ordering}', '-id')
+        if pk is not None:
+            queryset = queryset.filter(Q(**{f'{ordering}__lt': value}) | Q(**{ordering: value, 'id__lt': pk}))
+    else:
+        queryset = queryset.order_by(ordering, 'id')
+        queryset = queryset.filter(Q(**{f'{ordering}__gt': value}) | Q(**{ordering: value, 'id__gt': pk}))
+    return queryset, pk, direction
+
+
+def cursor_page(items: list, ordering: str, pk: Optional[int], direction: str, page_size: int) -> CursorPage:
+    """Страница из page_size + 1 прочитанных элементов: лишний элемент говорит о наличии следующей страницы"""
+    has_more = len(items) > page_size
+    items = items[:page_size]
+    if direction == 'prev':
+        items.reverse()
+
+    # При движении вперед предыдущая страница есть, если мы пришли по курсору, и наоборот
+    if direction == 'next':
+        has_next, has_previous = has_more, pk is not None
+    else:
+        has_next, has_previous = True, has_more
+
+    next_cursor = encode_cursor(ordering, items[-1], 'next') if items and has_next else None
+    previous_cursor = encode_cursor(ordering, items[0], 'prev') if items and has_previous else None
+
+    return CursorPage(items, next_cursor, previous_cursor)
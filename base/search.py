@@ -0,0 +1,119 @@
+import re
+from functools import lru_cache
+from typing import Iterable, List
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, QuerySet, Value, When
+from django.utils.module_loading import import_string
+
+from base.models import Product
+
+
+SEARCH_FIELDS = ('title', 'vendor', 'description')
+
+
+def tokenize(query: str) -> List[str]:
+    return re.findall(r'\w+', query.lower())
+
+
+class BaseSearchBackend:
+    """Интерфейс поискового индекса товаров.
+
+    Бэкенд хранит инвертированный индекс по полям SEARCH_FIELDS, обновляется инкрементально
+    при сохранении/удалении товара и возвращает id товаров в порядке релевантности.
+    """
+
+    def index(self, products: Iterable[Product]) -> None:
+        raise NotImplementedError
+
+    def remove(self, pks: Iterable[int]) -> None:
+        raise NotImplementedError
+
+    def rebuild(self) -> None:
+        raise NotImplementedError
+
+    def search(self, query: str, limit: int) -> List[int]:
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """Индекс на виртуальной таблице FTS5, rowid в ней совпадает с id товара"""
+    table = 'base_product_fts'
+    # Веса bm25 для title, vendor и description соответственно
+    weights = (10.0, 5.0, 1.0)
+
+    def index(self, products: Iterable[Product]) -> None:
+        rows = [(product.pk, *(getattr(product, field) for field in SEARCH_FIELDS)) for product in products]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(row[0],) for row in rows])
+            cursor.executemany(f'INSERT INTO {self.table} (rowid, title, vendor, description) '
+                               f'VALUES (%s, %s, %s, %s)', rows)
+
+    def remove(self, pks: Iterable[int]) -> None:
+        with connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(pk,) for pk in pks])
+
+    def rebuild(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(f'INSERT INTO {self.table} (rowid, title, vendor, description) '
+                           f'SELECT id, title, vendor, description FROM {Product._meta.db_table}')
+
+    def search(self, query: str, limit: int) -> List[int]:
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        # Каждое слово ищем как префикс, чтобы поиск работал по мере набора запроса
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        weights = ', '.join(str(weight) for weight in self.weights)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s '
+                           f'ORDER BY bm25({self.table}, {weights}) LIMIT %s', [match, limit])
+            return [row[0] for row in cursor.fetchall()]
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """Запасной бэкенд для СУБД без полнотекстового индекса: ищет по самим полям товара"""
+
+    def index(self, products: Iterable[Product]) -> None:
+        pass
+
+    def remove(self, pks: Iterable[int]) -> None:
+        pass
+
+    def rebuild(self) -> None:
+        pass
+
+    def search(self, query: str, limit: int) -> List[int]:
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        condition = Q()
+        for token in tokens:
+            condition &= Q(title__icontains=token) | Q(vendor__icontains=token) | Q(description__icontains=token)
+        score = Case(When(title__icontains=query, then=Value(2)), When(vendor__icontains=query, then=Value(1)),
+                     default=Value(0), output_field=IntegerField())
+        products = Product.objects.filter(condition).annotate(score=score).order_by('-score', '-id')
+        return list(products.values_list('pk', flat=True)[:limit])
+
+
+@lru_cache(maxsize=None)
+def get_search_backend() -> BaseSearchBackend:
+    backend_path = getattr(settings, 'PRODUCT_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+    if connection.vendor == 'sqlite':
+        return SQLiteFTSBackend()
+    return DatabaseSearchBackend()
+
+
+def search_products(queryset: QuerySet, query: str) -> List[int]:
+    """id товаров из queryset, найденных по запросу, в порядке релевантности"""
+    found_ids = get_search_backend().search(query, getattr(settings, 'PRODUCT_SEARCH_LIMIT', 1000))
+    if not found_ids:
+        return []
+    allowed = set(queryset.prefetch_related(None).filter(pk__in=found_ids).values_list('pk', flat=True))
+    return [pk for pk in found_ids if pk in allowed]
@@ -2,10 +2,36 @@ from django.db.models import fields
 from rest_framework import serializers
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from .authentication import add_user_claims
+from .metrics import measure
 from .models import *
 
 
-class UserSerializer(serializers.ModelSerializer):
+class TimedListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with measure('serialize'):
+            return super().data
+
+
+class BaseModelSerializer(serializers.ModelSerializer):
+    """ModelSerializer, время работы которого учитывается в метриках запроса (этап serialize)"""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        serializer = super().many_init(*args, **kwargs)
+        if type(serializer) is serializers.ListSerializer:
+            serializer.__class__ = TimedListSerializer
+        return serializer
+
+    @property
+    def data(self):
+        with measure('serialize'):
+            return super().data
+
+
+class UserSerializer(BaseModelSerializer):
     name = serializers.SerializerMethodField(read_only=True)
     is_staff = serializers.SerializerMethodField(read_only=True)
 
@@ -31,64 +57,172 @@ class UserSerializerWithToken(UserSerializer):
         fields = ['id', 'username', 'email', 'name', 'is_staff', 'token']
 
     def get_token(self, obj: User) -> str:
-        token = RefreshToken.for_user(obj)
+        token = add_user_claims(RefreshToken.for_user(obj), obj)
         return str(token.access_token)
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(BaseModelSerializer):
     class Meta:
         model = Review
         fields = '__all__'
 
 
-class ProductSerializer(serializers.ModelSerializer):
+# Поля карточки товара в каталоге
+PRODUCT_LIST_FIELDS = ['id', 'title', 'picture', 'picture_variants', 'price', 'rating', 'reviews_num']
+# Связанные данные, которые отдаются только по запросу ?expand=
+PRODUCT_EXPANSIONS = {'reviews'}
+
+
+class SparseFieldsMixin:
+    """Оставляет в сериализаторе только поля из аргумента fields"""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии изображения товара: {'thumb': url, ...}"""
+
+    def to_representation(self, value):
+        return {variant: default_storage.url(name) for variant, name in (value or {}).items()}
+
+
+class ProductDetailSerializer(SparseFieldsMixin, BaseModelSerializer):
+    """Все поля товара без отзывов"""
+    picture_variants = ImageVariantsField()
+
+    class Meta:
+        model = Product
+        fields = '__all__'
+
+
+class ProductListSerializer(BaseModelSerializer):
+    """Карточка товара для списков: набор полей фиксирован, отзывы не отдаются"""
+    picture_variants = ImageVariantsField()
+
+    class Meta:
+        model = Product
+        fields = PRODUCT_LIST_FIELDS
+
+
+class ProductSerializer(ProductDetailSerializer):
     reviews = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Product
         fields = '__all__'
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Подгружает отзывы всех товаров выборки одним запросом вместо запроса на каждый товар"""
+        return queryset.prefetch_related('reviews')
+
     def get_reviews(self, obj: Product):
         reviews = obj.reviews.all()
         serializer = ReviewSerializer(reviews, many=True)
         return serializer.data
 
 
-# class ShippingAddressSerializer(serializers.ModelSerializer):
-#     class Meta:
-#         model = ShippingAddress
-#         fields = '__all__'
-#
-#
-# class OrderItemSerializer(serializers.ModelSerializer):
-#     class Meta:
-#         model = OrderItem
-#         fields = '__all__'
-#
-#
-# class OrderSerializer(serializers.ModelSerializer):
-#     orderItems = serializers.SerializerMethodField(read_only=True)
-#     shippingAddress = serializers.SerializerMethodField(read_only=True)
-#     User = serializers.SerializerMethodField(read_only=True)
-#
-#     class Meta:
-#         model = Order
-#         fields = '__all__'
-#
-#     def get_orderItems(self, obj):
-#         items = obj.orderitem_set.all()
-#         serializer = OrderItemSerializer(items, many=True)
-#         return serializer.data
-#
-#     def get_shippingAddress(self, obj):
-#         try:
-#             address = ShippingAddressSerializer(obj.shippingaddress,
-#                                                 many=False).data
-#         except:
-#             address = False
-#         return address
-#
-#     def get_User(self, obj):
-#         items = obj.user
-#         serializer = UserSerializer(items, many=False)
-#         return serializer.data
+def _split_param(value: str) -> list:
+    return list(dict.fromkeys(item.strip() for item in value.split(',') if item.strip()))
+
+
+class ProductFieldset:
+    """Набор полей товара из параметров ?fields= и ?expand=.
+
+    Определяет и сериализатор, и колонки, которые читаются из БД, чтобы ответ
+    и SELECT сужались вместе. Без ?fields= используется набор полей по умолчанию.
+    """
+    columns = {field.name for field in Product._meta.concrete_fields}
+
+    def __init__(self, params, default_fields=None, default_expand=()):
+        fields = _split_param(params.get('fields', ''))
+        expand = set(_split_param(params.get('expand', '')))
+        # Связанные данные по умолчанию отдаются, только если набор полей не задан явно
+        if not fields and not expand:
+            expand = set(default_expand)
+        if 'reviews' in fields:
+            fields.remove('reviews')
+            expand.add('reviews')
+        unknown = set(fields) - self.columns | expand - PRODUCT_EXPANSIONS
+        if unknown:
+            raise ValueError(f'Unknown fields: {", ".join(sorted(unknown))}')
+
+        self.fields = fields or default_fields
+        self.with_reviews = 'reviews' in expand
+
+    def apply(self, queryset, *required):
+        """Ограничивает выборку нужными колонками; required - поля, нужные представлению"""
+        if self.fields is not None:
+            queryset = queryset.only(*self.fields, *required)
+        if self.with_reviews:
+            queryset = ProductSerializer.setup_eager_loading(queryset)
+        return queryset
+
+    def serialize(self, instance, many=False):
+        if self.with_reviews:
+            fields = None if self.fields is None else [*self.fields, 'reviews']
+            return ProductSerializer(instance, many=many, fields=fields).data
+        if self.fields == PRODUCT_LIST_FIELDS:
+            return ProductListSerializer(instance, many=many).data
+        return ProductDetailSerializer(instance, many=many, fields=self.fields).data
+
+
+class ProductSlimSerializer(BaseModelSerializer):
+    """Краткая карточка товара для корзины и пакетных запросов"""
+    picture_variants = ImageVariantsField()
+
+    class Meta:
+        model = Product
+        fields = ['id', 'title', 'price', 'stock_quantity', 'picture', 'picture_variants']
+
+
+class CartItemSerializer(BaseModelSerializer):
+    product = ProductSlimSerializer(read_only=True)
+
+    class Meta:
+        model = CartItem
+        fields = ['product', 'quantity', 'added_at']
+
+
+class BidSerializer(BaseModelSerializer):
+    class Meta:
+        model = Bid
+        fields = '__all__'
+
+
+class LotSerializer(BaseModelSerializer):
+    class Meta:
+        model = Lot
+        # Автоставку лидера видят только администраторы: иначе участники знали бы, до какой суммы он готов идти
+        exclude = ['leader_max']
+
+
+class DeliveryAddressSerializer(BaseModelSerializer):
+    class Meta:
+        model = DeliveryAddress
+        fields = '__all__'
+
+
+class OrderItemSerializer(BaseModelSerializer):
+    class Meta:
+        model = OrderItem
+        fields = '__all__'
+
+
+class OrderSerializer(BaseModelSerializer):
+    order_items = OrderItemSerializer(many=True, read_only=True)
+    delivery_address = DeliveryAddressSerializer(read_only=True)
+    customer = UserSerializer(read_only=True)
+
+    class Meta:
+        model = Order
+        fields = '__all__'
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Покупатель и адрес подтягиваются JOIN-ом, позиции - одним запросом на всю выборку"""
+        return queryset.select_related('customer', 'delivery_address').prefetch_related('order_items')
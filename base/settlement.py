@@ -0,0 +1,84 @@
+import logging
+from datetime import datetime
+from typing import Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from base.models import Lot, Order, OrderItem
+
+
+logger = logging.getLogger(__name__)
+
+
+class SettlementConflict(Exception):
+    """Часть лотов пачки закрыта другим обработчиком. Транзакция пачки откатывается, пачка выбирается заново"""
+
+
+def expired_lots(now: datetime):
+    """Лоты с истекшим сроком торгов в порядке окончания (частичный индекс base_lot_open_ends_at)"""
+    return Lot.objects.filter(is_active=True, ends_at__lte=now).order_by('ends_at', 'pk')
+
+
+def next_deadline() -> Optional[datetime]:
+    return (Lot.objects.filter(is_active=True, ends_at__isnull=False).order_by('ends_at')
+            .values_list('ends_at', flat=True).first())
+
+
+def settle_batch(now: datetime, batch_size: int) -> int:
+    """Закрывает до batch_size истекших лотов в одной транзакции и возвращает их число.
+
+    Победителю каждого лота создается заказ на финальную цену; заказы и позиции вставляются
+    двумя bulk_create, лоты закрываются одним bulk_update. Лот выбирается, только пока торги
+    по нему идут, поэтому повтор после сбоя или параллельный обработчик не создают второй заказ.
+    Подписчикам закрытие не рассылается: закрывает отдельный процесс (settle_lots), а брокер живет
+    в памяти процесса сервера. Клиенты считают торги оконченными по ends_at, который им уже отправлен.
+    """
+    with transaction.atomic():
+        # Читаются и колонки, которые перезапишет bulk_update: иначе отложенные поля догружались бы по одному
+        lots = expired_lots(now).select_related('product').only(
+            'current_price', 'leader', 'ends_at', 'is_active', 'closed_at', 'order', 'product__title')
+        if connection.features.has_select_for_update_skip_locked:
+            # Параллельные обработчики разбирают разные лоты, не дожидаясь друг друга
+            lots = lots.select_for_update(skip_locked=True, of=('self',))
+        lots = list(lots[:batch_size])
+        if not lots:
+            return 0
+
+        # Условный UPDATE закрепляет пачку за этим обработчиком
+        if Lot.objects.filter(pk__in=[lot.pk for lot in lots], is_active=True).update(is_active=False) != len(lots):
+            raise SettlementConflict()
+
+        sold = [lot for lot in lots if lot.leader_id is not None]
+        orders = Order.objects.bulk_create([
+            Order(customer_id=lot.leader_id, total_cost=lot.current_price, payment_method='') for lot in sold
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_id=lot.product_id, title=lot.product.title, quantity=1,
+                      price=lot.current_price)
+            for lot, order in zip(sold, orders)
+        ])
+        for lot, order in zip(sold, orders):
+            lot.order = order
+        for lot in lots:
+            lot.is_active = False
+            lot.closed_at = now
+        Lot.objects.bulk_update(lots, ['is_active', 'closed_at', 'order'], batch_size=500)
+    return len(lots)
+
+
+def settle_expired_lots(now: Optional[datetime] = None, batch_size: Optional[int] = None) -> int:
+    """Закрывает все лоты, срок которых истек к моменту now, пачками по batch_size"""
+    now = now or timezone.now()
+    batch_size = batch_size or getattr(settings, 'AUCTION_SETTLE_BATCH_SIZE', 500)
+    settled = 0
+    while True:
+        try:
+            count = settle_batch(now, batch_size)
+        except SettlementConflict:
+            logger.info('Settlement batch conflicted with another worker, retrying')
+            continue
+        if not count:
+            return settled
+        settled += count
@@ -1,6 +1,16 @@
-from django.db.models.signals import pre_save
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.contrib.auth.models import User
 
+from base.authentication import invalidate_user
+from base.cache import CATALOG_SCOPE, invalidate_on_commit, product_scope
+from base.categories import adjust_product_counts
+from base.leaderboard import refresh_leaderboard
+from base.live import publish_saved
+from base.metrics import record_query
+from base.models import Category, Lot, Product, Review
+from base.search import SEARCH_FIELDS, get_search_backend
+
 
 def updateUser(sender, instance, **kwargs):
     user = instance
@@ -8,4 +18,86 @@ def updateUser(sender, instance, **kwargs):
         user.username = user.email
 
 
+def invalidate_user_cache(sender, instance: User, **kwargs):
+    invalidate_user(instance.pk)
+
+
+def invalidate_deleted_user_cache(sender, instance: User, **kwargs):
+    invalidate_user(instance.pk, deleted=True)
+
+
+def index_product(sender, instance: Product, update_fields=None, **kwargs):
+    # Изменение цены или остатка не затрагивает поисковый индекс
+    if update_fields is not None and not set(update_fields) & set(SEARCH_FIELDS):
+        return
+    get_search_backend().index([instance])
+
+
+def unindex_product(sender, instance: Product, **kwargs):
+    get_search_backend().remove([instance.pk])
+
+
+def update_leaderboard(sender, instance: Product, update_fields=None, **kwargs):
+    if update_fields is None or 'rating' in update_fields:
+        refresh_leaderboard([instance.pk])
+
+
+def remember_product_category(sender, instance: Product, update_fields=None, **kwargs):
+    # Запоминаем прежнюю категорию, чтобы перенести товар между счетчиками после сохранения
+    if not instance._state.adding and (update_fields is None or 'category' in update_fields):
+        instance._previous_category_id = (Product.objects.filter(pk=instance.pk)
+                                          .values_list('category_id', flat=True).first())
+
+
+def count_saved_product(sender, instance: Product, created: bool, **kwargs):
+    previous_category_id = instance.__dict__.pop('_previous_category_id', instance.category_id)
+    if created:
+        previous_category_id = None
+    if previous_category_id != instance.category_id:
+        adjust_product_counts(previous_category_id, -1)
+        adjust_product_counts(instance.category_id, 1)
+
+
+def count_deleted_product(sender, instance: Product, **kwargs):
+    adjust_product_counts(instance.category_id, -1)
+
+
+def invalidate_product_cache(sender, instance: Product, **kwargs):
+    invalidate_on_commit(CATALOG_SCOPE, product_scope(instance.pk))
+
+
+def invalidate_review_cache(sender, instance: Review, **kwargs):
+    invalidate_on_commit(CATALOG_SCOPE, product_scope(instance.to_product_id))
+
+
+def invalidate_catalog_cache(sender, instance: Category, **kwargs):
+    invalidate_on_commit(CATALOG_SCOPE)
+
+
+def publish_live_changes(sender, instance, update_fields=None, **kwargs):
+    publish_saved(instance, update_fields)
+
+
+def install_query_metrics(sender, connection, **kwargs):
+    # Запросы считаются на каждом соединении, в том числе открытом в потоке асинхронного ORM
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
 pre_save.connect(updateUser, sender=User)
+post_save.connect(invalidate_user_cache, sender=User)
+post_delete.connect(invalidate_deleted_user_cache, sender=User)
+post_save.connect(index_product, sender=Product)
+post_delete.connect(unindex_product, sender=Product)
+post_save.connect(update_leaderboard, sender=Product)
+pre_save.connect(remember_product_category, sender=Product)
+post_save.connect(count_saved_product, sender=Product)
+post_delete.connect(count_deleted_product, sender=Product)
+post_save.connect(publish_live_changes, sender=Product)
+post_save.connect(publish_live_changes, sender=Lot)
+connection_created.connect(install_query_metrics)
+
+for signal in (post_save, post_delete):
+    signal.connect(invalidate_product_cache, sender=Product)
+    signal.connect(invalidate_review_cache, sender=Review)
+    signal.connect(invalidate_catalog_cache, sender=Category)
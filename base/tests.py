@@ -0,0 +1,447 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.tokens import AccessToken
+
+from base.auction import BidRejected, parse_amount, place_bid, resolve_bid
+from base.authentication import StatelessJWTAuthentication, add_user_claims
+from base.jobs import claim_job, enqueue, requeue_stale, run_pending, task
+from base.leaderboard import rebuild_leaderboard
+from base.models import Bid, Category, Job, Lot, Order, OrderItem, Product, ProxyBid, Review
+from base.settlement import SettlementConflict, expired_lots, settle_batch, settle_expired_lots
+from base.throttling import LoginIPThrottle, throttle_stats
+
+
+# Кэши в памяти: тесты не читают и не оставляют файловый кэш и корзины ограничений между прогонами
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-default'},
+    'throttle': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-throttle'},
+}
+
+
+@override_settings(QUERY_BUDGET_STRICT=True, CACHES=LOCMEM_CACHES)
+class ProductListQueriesTest(TestCase):
+    """Число SQL-запросов эндпоинтов списка товаров не зависит от числа товаров и отзывов.
+
+    Бюджеты with_query_budget в строгом режиме вызывают QueryBudgetExceeded, поэтому тест
+    проверяет и их, и то, что запросов одинаково мало на маленьком и большом каталоге.
+    """
+    URLS = (
+        '/api/products/',
+        '/api/products/?expand=reviews',
+        '/api/products/?paginate=cursor&ordering=rating&expand=reviews',
+        '/api/products/top/?min_rating=3',
+        '/api/products/batch/?ids={ids}',
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reviewers = [User.objects.create(username=f'reviewer-{number}@example.com') for number in range(3)]
+        cls.category = Category.add_root(name='Anime')
+
+    def add_products(self, count: int) -> None:
+        products = Product.objects.bulk_create([
+            Product(title=f'Figure {number}', price=10 + number, rating=number % 5 + 1, category=self.category)
+            for number in range(count)
+        ])
+        Review.objects.bulk_create([Review(to_product=product, reviewer=reviewer, rating=4)
+                                    for product in products for reviewer in self.reviewers])
+        rebuild_leaderboard()
+
+    def count_queries(self, url: str) -> int:
+        cache.clear()
+        ids = ','.join(map(str, Product.objects.values_list('pk', flat=True)[:20]))
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url.format(ids=ids))
+        self.assertEqual(response.status_code, 200, url)
+        return len(context)
+
+    def test_queries_do_not_grow_with_catalog(self):
+        self.add_products(2)
+        small = {url: self.count_queries(url) for url in self.URLS}
+        self.add_products(30)
+        large = {url: self.count_queries(url) for url in self.URLS}
+        self.assertEqual(small, large)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TopProductsParamsTest(TestCase):
+    def test_non_finite_min_rating_is_rejected(self):
+        for value in ('NaN', 'sNaN', 'Infinity', '-inf'):
+            response = self.client.get(f'/api/products/top/?min_rating={value}')
+            self.assertEqual(response.status_code, 400, value)
+
+    @override_settings(TOP_PRODUCTS={'LIMIT': 5, 'MAX_LIMIT': 50, 'MIN_RATING': 4, 'FLOOR_RATING': 3})
+    def test_min_rating_below_floor_is_rejected(self):
+        response = self.client.get('/api/products/top/?min_rating=1')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['detail'], 'min_rating must be at least 3')
+        self.assertEqual(self.client.get('/api/products/top/?min_rating=3').status_code, 200)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TokenRevocationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='buyer@example.com', email='buyer@example.com')
+
+    def issue_token(self, iat: int) -> AccessToken:
+        token = add_user_claims(AccessToken.for_user(self.user), self.user)
+        token['iat'] = iat
+        return token
+
+    def authenticate(self, token):
+        return StatelessJWTAuthentication().get_user(token)
+
+    def test_token_issued_in_same_second_uses_claims(self):
+        self.assertIsInstance(self.authenticate(self.issue_token(int(time.time()))), TokenUser)
+
+    def test_revocation_survives_cache_eviction(self):
+        token = self.issue_token(int(time.time()) - 10)
+        self.user.is_staff = True
+        self.user.save()
+        cache.clear()
+        user = self.authenticate(token)
+        self.assertIsInstance(user, User)
+        self.assertTrue(user.is_staff)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CreateProductTest(TestCase):
+    def test_admin_with_token_creates_product(self):
+        cache.clear()
+        admin = User.objects.create(username='admin@example.com', email='admin@example.com', is_staff=True)
+        Category.add_root(name='Anime')
+        token = add_user_claims(AccessToken.for_user(admin), admin)
+        response = self.client.post('/api/products/create/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Product.objects.get(pk=response.json()['id']).customer_id, admin.pk)
+
+
+class ParseAmountTest(TestCase):
+    def test_invalid_amounts_are_rejected(self):
+        for value in ('NaN', 'sNaN', 'Infinity', '5000000000', '0', '-1', 'abc', None):
+            with self.assertRaises(BidRejected, msg=value) as context:
+                parse_amount(value)
+            self.assertEqual(context.exception.code, 'invalid')
+
+    def test_amount_is_rounded_to_cents(self):
+        self.assertEqual(parse_amount('999999.99'), Decimal('999999.99'))
+        self.assertEqual(parse_amount(10.5), Decimal('10.50'))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class BulkUpdateProductsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create(username='admin@example.com', email='admin@example.com', is_staff=True)
+        self.product = Product.objects.create(title='Figure', price=10, category=Category.add_root(name='Anime'))
+        self.token = add_user_claims(AccessToken.for_user(self.admin), self.admin)
+
+    def put(self, body):
+        return self.client.put('/api/products/bulk/', body, content_type='application/json',
+                               HTTP_AUTHORIZATION=f'Bearer {self.token}')
+
+    def test_invalid_prices_are_reported_per_item(self):
+        for price in ('NaN', 'Infinity', '5000000000', '-1'):
+            response = self.put({'products': [{'id': self.product.pk, 'price': price}]})
+            self.assertEqual(response.status_code, 400, price)
+            self.assertIn('0', response.json()['errors'], price)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).price, Decimal('10.00'))
+
+    def test_price_rule_cannot_overflow_prices(self):
+        response = self.put({'price_rule': {'percent': 10 ** 7}})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).price, Decimal('10.00'))
+
+    def test_body_must_be_an_object(self):
+        self.assertEqual(self.put([1]).status_code, 400)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CartBodyTest(TestCase):
+    def test_body_must_be_an_object(self):
+        cache.clear()
+        user = User.objects.create(username='buyer@example.com', email='buyer@example.com')
+        token = add_user_claims(AccessToken.for_user(user), user)
+        for method, url in (('put', '/api/cart/update/'), ('post', '/api/cart/validate/')):
+            for body in ([1], 1, 'cart'):
+                response = getattr(self.client, method)(url, body, content_type='application/json',
+                                                        HTTP_AUTHORIZATION=f'Bearer {token}')
+                self.assertEqual(response.status_code, 400, (url, body))
+
+
+class ProxyBidTest(TestCase):
+    """Правила автоставок: цена поднимается до шага над проигравшей суммой, при равенстве побеждает более ранняя"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.first, cls.second = (User.objects.create(username=f'bidder-{number}@example.com') for number in range(2))
+        cls.product = Product.objects.create(title='Figure', price=10, category=Category.add_root(name='Anime'))
+
+    def setUp(self):
+        self.lot = Lot.objects.create(product=self.product, start_price=10, current_price=10, min_step=1,
+                                      ends_at=timezone.now() + timedelta(days=1))
+
+    def bid(self, user, amount, expected_version=None):
+        return place_bid(self.lot.pk, user, Decimal(amount), expected_version)
+
+    def test_first_bid_takes_start_price(self):
+        result = self.bid(self.first, '50')
+        self.assertTrue(result.leading)
+        self.assertEqual((result.lot.current_price, result.lot.leader_max), (Decimal('10'), Decimal('50')))
+        self.assertEqual(result.bid.amount, Decimal('10'))
+
+    def test_higher_bid_pays_step_over_loser(self):
+        self.bid(self.first, '50')
+        result = self.bid(self.second, '80')
+        self.assertTrue(result.leading)
+        self.assertEqual(result.lot.current_price, Decimal('51'))
+        self.assertEqual(self.bid(self.first, '80.50').lot.current_price, Decimal('80.50'))
+
+    def test_tie_goes_to_earlier_bidder(self):
+        self.bid(self.first, '50')
+        result = self.bid(self.second, '50')
+        self.assertFalse(result.leading)
+        self.assertEqual((result.lot.leader_id, result.lot.current_price), (self.first.pk, Decimal('50')))
+
+    def test_losing_bid_raises_price_by_step(self):
+        self.bid(self.first, '50')
+        self.assertEqual(self.bid(self.second, '30').lot.current_price, Decimal('31'))
+
+    def test_leader_raising_max_keeps_visible_price(self):
+        self.bid(self.first, '50')
+        result = self.bid(self.first, '90')
+        self.assertIsNone(result.bid)
+        lot = Lot.objects.get(pk=self.lot.pk)
+        self.assertEqual((lot.current_price, lot.leader_max, lot.version), (Decimal('10'), Decimal('90'), 1))
+        self.assertEqual(Bid.objects.filter(lot=lot).count(), 1)
+        self.assertEqual(ProxyBid.objects.get(lot=lot, bidder=self.first).max_amount, Decimal('90'))
+        with self.assertRaises(BidRejected) as context:
+            self.bid(self.first, '90')
+        self.assertEqual(context.exception.code, 'too_low')
+
+    def test_bid_below_minimum_is_rejected(self):
+        self.bid(self.first, '50')
+        with self.assertRaises(BidRejected) as context:
+            self.bid(self.second, '10.50')
+        self.assertEqual(context.exception.code, 'too_low')
+
+    def test_stale_version_is_rejected(self):
+        self.bid(self.first, '50')
+        with self.assertRaises(BidRejected) as context:
+            self.bid(self.second, '80', expected_version=0)
+        self.assertEqual(context.exception.code, 'stale')
+
+    def test_closed_lot_rejects_bids(self):
+        Lot.objects.filter(pk=self.lot.pk).update(ends_at=timezone.now() - timedelta(seconds=1))
+        with self.assertRaises(BidRejected) as context:
+            self.bid(self.first, '50')
+        self.assertEqual(context.exception.code, 'closed')
+
+    @override_settings(AUCTION_SNIPING_WINDOW=120, AUCTION_SNIPING_EXTENSION=300)
+    def test_bid_in_last_minutes_extends_bidding(self):
+        Lot.objects.filter(pk=self.lot.pk).update(ends_at=timezone.now() + timedelta(seconds=60))
+        result = self.bid(self.first, '50')
+        self.assertGreater(result.lot.ends_at, timezone.now() + timedelta(seconds=290))
+
+    def test_concurrent_change_is_resolved_again(self):
+        self.bid(self.first, '50')
+        calls = []
+
+        def resolve_after_competitor(lot, user, amount):
+            if not calls:
+                # Между чтением лота и UPDATE другой участник перебивает лидера
+                Lot.objects.filter(pk=lot.pk).update(leader=self.first, leader_max=Decimal('70'),
+                                                     current_price=Decimal('60'), version=lot.version + 1)
+            calls.append(lot.version)
+            return resolve_bid(lot, user, amount)
+
+        with mock.patch('base.auction.resolve_bid', side_effect=resolve_after_competitor):
+            result = self.bid(self.second, '65')
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual((result.lot.leader_id, result.lot.current_price), (self.first.pk, Decimal('66')))
+        self.assertEqual(Lot.objects.get(pk=self.lot.pk).version, 3)
+
+
+class SettlementTest(TestCase):
+    """Закрытие торгов: заказ победителю на финальную цену, повторный проход заказов не создает"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.winner = User.objects.create(username='winner@example.com')
+        cls.product = Product.objects.create(title='Figure', price=10, category=Category.add_root(name='Anime'))
+
+    def setUp(self):
+        self.now = timezone.now()
+        ended = self.now - timedelta(minutes=1)
+        self.sold = [Lot.objects.create(product=self.product, start_price=10, current_price=20 + number,
+                                        leader=self.winner, leader_max=50, bids_num=1, ends_at=ended)
+                     for number in range(3)]
+        self.unsold = Lot.objects.create(product=self.product, start_price=10, current_price=10, ends_at=ended)
+        self.running = Lot.objects.create(product=self.product, start_price=10, current_price=10,
+                                          ends_at=self.now + timedelta(hours=1))
+
+    def test_expired_lots_are_settled_in_batches(self):
+        self.assertEqual(settle_expired_lots(self.now, batch_size=2), 4)
+        for lot in self.sold:
+            lot.refresh_from_db()
+            self.assertFalse(lot.is_active)
+            self.assertEqual(lot.closed_at, self.now)
+            self.assertEqual((lot.order.customer_id, lot.order.total_cost), (self.winner.pk, lot.current_price))
+            item = OrderItem.objects.get(order=lot.order)
+            self.assertEqual((item.product_id, item.price, item.quantity), (self.product.pk, lot.current_price, 1))
+        self.unsold.refresh_from_db()
+        self.assertEqual((self.unsold.is_active, self.unsold.order_id), (False, None))
+        self.running.refresh_from_db()
+        self.assertTrue(self.running.is_active)
+
+    def test_second_pass_creates_no_duplicate_orders(self):
+        settle_expired_lots(self.now)
+        self.assertEqual(settle_expired_lots(self.now), 0)
+        self.assertEqual(Order.objects.count(), 3)
+
+    def test_conflicting_batch_is_rolled_back_and_retried(self):
+        # Другой обработчик уже закрыл один из лотов, выбранных в пачку
+        Lot.objects.filter(pk=self.sold[0].pk).update(is_active=False)
+        stale = Lot.objects.filter(pk__in=[lot.pk for lot in self.sold]).order_by('pk')
+        with mock.patch('base.settlement.expired_lots', return_value=stale):
+            with self.assertRaises(SettlementConflict):
+                settle_batch(self.now, 10)
+        self.assertEqual(Order.objects.count(), 0)
+        self.assertEqual(Lot.objects.filter(is_active=False).count(), 1)
+
+        with mock.patch('base.settlement.expired_lots', side_effect=[stale, expired_lots(self.now),
+                                                                      expired_lots(self.now)]):
+            self.assertEqual(settle_expired_lots(self.now), 3)
+        self.assertEqual(Order.objects.count(), 2)
+
+
+@override_settings(CACHES=LOCMEM_CACHES,
+                   THROTTLE_BUCKETS={'login.ip': (2, '60/min'), 'login.account': (2, '60/min')})
+class TokenBucketThrottleTest(TestCase):
+    def setUp(self):
+        caches['throttle'].clear()
+        throttle_stats.reset()
+
+    def login(self, username: str, address: str = '10.0.0.1'):
+        return self.client.post('/api/users/login/', {'username': username, 'password': 'wrong'},
+                                REMOTE_ADDR=address)
+
+    def test_exhausted_bucket_returns_429_with_retry_after(self):
+        statuses = [self.login('victim@example.com', f'10.0.0.{number}').status_code for number in range(3)]
+        self.assertEqual(statuses, [401, 401, 429])
+        response = self.login('victim@example.com', '10.0.0.9')
+        self.assertEqual((response.status_code, response['Retry-After']), (429, '1'))
+        self.assertEqual(throttle_stats.summary()['login.account'], {'allowed': 2, 'throttled': 2})
+        # Другая учетная запись с нового адреса ограничением не затронута
+        self.assertEqual(self.login('other@example.com', '10.0.1.1').status_code, 401)
+
+    def test_bucket_refills_over_time(self):
+        request = RequestFactory().post('/api/users/login/', REMOTE_ADDR='10.0.0.1')
+        throttle = LoginIPThrottle()
+        with mock.patch('base.throttling.time.time', return_value=1000.0):
+            self.assertEqual([throttle.allow_request(request, None) for _ in range(3)], [True, True, False])
+            self.assertAlmostEqual(throttle.wait(), 1)
+        with mock.patch('base.throttling.time.time', return_value=1001.0):
+            self.assertEqual([throttle.allow_request(request, None) for _ in range(2)], [True, False])
+        with mock.patch('base.throttling.time.time', return_value=1100.0):
+            self.assertEqual([throttle.allow_request(request, None) for _ in range(3)], [True, True, False])
+
+    @override_settings(THROTTLE_BUCKETS={})
+    def test_scope_without_bucket_is_not_limited(self):
+        self.assertEqual({self.login('victim@example.com').status_code for _ in range(5)}, {401})
+
+
+# Вызовы тестовых задач очереди: (имя задачи, аргумент)
+task_calls = []
+
+
+@task(priority=0)
+def record_task(name: str) -> None:
+    task_calls.append(('record', name))
+
+
+@task(priority=10)
+def urgent_task(name: str) -> None:
+    task_calls.append(('urgent', name))
+
+
+@task(max_attempts=3)
+def failing_task() -> None:
+    raise RuntimeError('boom')
+
+
+@override_settings(JOBS_EAGER=False, JOB_RETRY_DELAY=10, JOB_TIMEOUT=600)
+class JobQueueTest(TestCase):
+    def setUp(self):
+        task_calls.clear()
+
+    def test_jobs_run_by_priority(self):
+        enqueue(record_task, name='first')
+        enqueue(urgent_task, name='second')
+        self.assertEqual(run_pending(), 2)
+        self.assertEqual(task_calls, [('urgent', 'second'), ('record', 'first')])
+        self.assertEqual(set(Job.objects.values_list('status', flat=True)), {Job.DONE})
+
+    def test_delayed_job_waits_for_run_at(self):
+        enqueue(record_task, delay=60, name='later')
+        self.assertEqual(run_pending(), 0)
+        self.assertEqual(task_calls, [])
+
+    def test_run_pending_stops_at_limit(self):
+        for number in range(3):
+            enqueue(record_task, name=str(number))
+        self.assertEqual(run_pending(2), 2)
+        self.assertEqual(Job.objects.filter(status=Job.QUEUED).count(), 1)
+
+    def test_jobs_are_claimed_one_at_a_time(self):
+        first, second = enqueue(urgent_task, name='first'), enqueue(record_task, name='second')
+        job = claim_job()
+        self.assertEqual((job.pk, job.status, job.attempts), (first.pk, Job.RUNNING, 1))
+        second.refresh_from_db()
+        self.assertEqual((second.status, second.started_at), (Job.QUEUED, None))
+
+    def test_failed_job_is_retried_with_backoff_then_failed(self):
+        job = enqueue(failing_task)
+        for attempt, delay in ((1, 10), (2, 20)):
+            started = timezone.now()
+            with self.assertLogs('base.jobs', 'WARNING'):
+                self.assertEqual(run_pending(), 1)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), (Job.QUEUED, attempt))
+            self.assertIn('RuntimeError: boom', job.last_error)
+            self.assertAlmostEqual((job.run_at - started).total_seconds(), delay, delta=1)
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+
+        with self.assertLogs('base.jobs', 'WARNING'):
+            self.assertEqual(run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 3))
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(run_pending(), 0)
+
+    def test_stale_jobs_are_requeued_or_failed(self):
+        now = timezone.now()
+        stale = now - timedelta(hours=1)
+        retried, exhausted, running = (
+            Job.objects.create(task='base.tests.record_task', status=Job.RUNNING, attempts=attempts, max_attempts=3,
+                               started_at=started_at)
+            for attempts, started_at in ((1, stale), (3, stale), (1, now))
+        )
+        self.assertEqual(requeue_stale(), 1)
+        for job in (retried, exhausted, running):
+            job.refresh_from_db()
+        self.assertEqual(retried.status, Job.QUEUED)
+        self.assertEqual(exhausted.status, Job.FAILED)
+        self.assertIn('Timed out', exhausted.last_error)
+        self.assertEqual(running.status, Job.RUNNING)
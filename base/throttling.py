@@ -0,0 +1,149 @@
+import hashlib
+import math
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from rest_framework.throttling import BaseThrottle
+
+
+# Длительность периода в секундах по первой букве: 10/min, 100/hour и т.п. (как в DRF)
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_bucket(bucket) -> Tuple[int, float]:
+    """(емкость, 'N/период') из THROTTLE_BUCKETS -> (емкость, пополнение в токенах за секунду)"""
+    capacity, rate = bucket
+    number, period = rate.split('/')
+    return int(capacity), int(number) / PERIODS[period[0]]
+
+
+class ThrottleStats:
+    """Счетчики пропущенных и отклоненных запросов по областям ограничения. У каждого воркера свои"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Counter] = {}
+
+    def record(self, scope: str, allowed: bool) -> None:
+        with self._lock:
+            self._counts.setdefault(scope, Counter())['allowed' if allowed else 'throttled'] += 1
+
+    def summary(self) -> Dict[str, dict]:
+        with self._lock:
+            return {scope: {'allowed': counts['allowed'], 'throttled': counts['throttled']}
+                    for scope, counts in sorted(self._counts.items())}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+throttle_stats = ThrottleStats()
+
+
+def get_throttle_cache():
+    """Кэш корзин: псевдоним THROTTLE_CACHE, а если он не настроен - кэш по умолчанию"""
+    alias = getattr(settings, 'THROTTLE_CACHE', 'throttle')
+    return caches[alias if alias in settings.CACHES else DEFAULT_CACHE_ALIAS]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Ограничение частоты запросов корзиной токенов в кэше THROTTLE_CACHE.
+
+    Корзина емкостью capacity пополняется с постоянной скоростью, каждый запрос забирает токен:
+    допускаются всплески до capacity запросов, в среднем - не чаще заданной скорости. Параметры
+    берутся из THROTTLE_BUCKETS по scope, без них ограничение выключено. Проверка выполняется
+    DRF до работы представления, отказ стоит одного чтения из кэша; тело запроса разбирают
+    только ограничения, которым нужны его данные (AccountTokenBucketThrottle).
+    Чтение и запись состояния корзины не атомарны, поэтому при одновременных запросах
+    из разных воркеров ограничение приблизительное.
+    """
+    scope: str = None
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def get_ident_key(self, request) -> Optional[str]:
+        """Кого ограничиваем; None - запрос этим ограничением не учитывается"""
+        raise NotImplementedError
+
+    def allow_request(self, request, view) -> bool:
+        bucket = getattr(settings, 'THROTTLE_BUCKETS', {}).get(self.scope)
+        ident = self.get_ident_key(request) if bucket else None
+        if ident is None:
+            return True
+
+        capacity, refill = parse_bucket(bucket)
+        key = f'throttle:{self.scope}:{hashlib.md5(ident.encode()).hexdigest()}'
+        cache = get_throttle_cache()
+        now = time.time()
+        tokens, updated = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill)
+        if tokens < 1:
+            self.wait_seconds = (1 - tokens) / refill
+            throttle_stats.record(self.scope, False)
+            return False
+
+        # Запись живет, пока корзина не наполнится снова: полная корзина равносильна отсутствию записи
+        cache.set(key, (tokens - 1, now), timeout=math.ceil(capacity / refill) + 1)
+        throttle_stats.record(self.scope, True)
+        return True
+
+    def wait(self) -> Optional[float]:
+        return self.wait_seconds
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Корзина на авторизованного пользователя, анонимные запросы не учитываются"""
+
+    def get_ident_key(self, request) -> Optional[str]:
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return None
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """Корзина на IP-адрес клиента (с учетом NUM_PROXIES из настроек DRF)"""
+
+    def get_ident_key(self, request) -> Optional[str]:
+        return f'ip:{self.get_ident(request)}'
+
+
+class AccountTokenBucketThrottle(TokenBucketThrottle):
+    """Корзина на учетную запись из тела запроса входа: перебор пароля одного аккаунта с разных адресов"""
+
+    def get_ident_key(self, request) -> Optional[str]:
+        username = request.data.get('username') if hasattr(request.data, 'get') else None
+        return f'account:{str(username).strip().lower()}' if username else None
+
+
+class ReviewUserThrottle(UserTokenBucketThrottle):
+    scope = 'review.user'
+
+
+class ReviewIPThrottle(IPTokenBucketThrottle):
+    scope = 'review.ip'
+
+
+class PriceUserThrottle(UserTokenBucketThrottle):
+    scope = 'price.user'
+
+
+class PriceIPThrottle(IPTokenBucketThrottle):
+    scope = 'price.ip'
+
+
+class RegisterIPThrottle(IPTokenBucketThrottle):
+    scope = 'register.ip'
+
+
+class LoginIPThrottle(IPTokenBucketThrottle):
+    scope = 'login.ip'
+
+
+class LoginAccountThrottle(AccountTokenBucketThrottle):
+    scope = 'login.account'
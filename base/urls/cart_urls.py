@@ -0,0 +1,11 @@
+from django.urls import path
+from base.views import cart_views as views
+
+
+app_name = 'base_cart'
+
+urlpatterns = [
+    path('', views.get_cart, name="get_cart"),
+    path('update/', views.update_cart, name="update_cart"),  # PUT
+    path('validate/', views.validate_cart, name="validate_cart"),  # POST
+]
@@ -0,0 +1,9 @@
+from django.urls import path
+from base.views import category_views as views
+
+
+app_name = 'base_categories'
+
+urlpatterns = [
+    path('', views.get_category_tree, name="category_tree"),
+]
@@ -0,0 +1,9 @@
+from django.urls import path
+from base.views import live_views as views
+
+
+app_name = 'base_live'
+
+urlpatterns = [
+    path('', views.live_updates, name="live_updates"),
+]
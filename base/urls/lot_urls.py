@@ -0,0 +1,14 @@
+from django.urls import path, include
+from base.views import lot_views as views
+
+
+app_name = 'base_lots'
+
+urlpatterns = [
+    path('', views.get_lots, name="get_lots"),
+    path('create/', views.create_lot, name="create_lot"),  # POST
+    path('<int:pk>/', include([
+        path('', views.get_lot, name="get_lot"),
+        path('bids/', views.place_bid, name="place_bid"),  # POST
+    ])),
+]
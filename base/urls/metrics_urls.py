@@ -0,0 +1,10 @@
+from django.urls import path
+from base.views import metrics_views as views
+
+
+app_name = 'base_metrics'
+
+urlpatterns = [
+    path('', views.get_endpoint_metrics, name="endpoint_metrics"),
+    path('reset/', views.reset_endpoint_metrics, name="reset_endpoint_metrics"),  # DELETE
+]
@@ -1,12 +1,16 @@
-from django.urls import path
+from django.urls import path, include
 from base.views import order_views as views
 
-# urlpatterns = [
-#     path('', views.getOrders, name="allorders"),
-#     path('add/', views.addOrderItems, name="orders-add"),
-#     path('myorders/', views.getMyOrders, name="myorders"),
-#
-#     path('<str:pk>/deliver/', views.updateOrderToDelivered, name="delivered"),
-#     path('<str:pk>/', views.getOrderById, name="user-order"),
-#     path('<str:pk>/pay/', views.updateOrderToPaid, name="pay"),
-# ]
+
+app_name = 'base_orders'
+
+urlpatterns = [
+    path('', views.get_orders, name="all_orders"),
+    path('add/', views.add_order_items, name="orders_add"),  # POST
+    path('myorders/', views.get_my_orders, name="my_orders"),
+    path('<int:pk>/', include([
+        path('', views.get_order_by_id, name="user_order"),
+        path('pay/', views.update_order_to_paid, name="pay"),  # PUT
+        path('deliver/', views.update_order_to_delivered, name="delivered"),  # PUT
+    ])),
+]
@@ -1,16 +1,22 @@
+from django.conf import settings
 from django.urls import path, include
-from base.views import product_views as views
+from base.views import async_product_views, product_views as views
+
+# Под ASGI публичные эндпоинты чтения каталога обслуживаются асинхронными представлениями
+read_views = async_product_views if settings.ASYNC_CATALOG_VIEWS else views
 
 
 app_name = 'base_products'
 
 urlpatterns = [
-    path('', views.get_products, name="get_products"),
-    path('top/', views.get_top_products, name="top_products"),
+    path('', read_views.get_products, name="get_products"),
+    path('top/', read_views.get_top_products, name="top_products"),
+    path('batch/', views.get_products_batch, name="products_batch"),
     path('create/', views.create_product, name="create_product"),  # POST
+    path('bulk/', views.bulk_update_products, name="bulk_update_products"),  # PUT
     path('upload/', views.upload_image, name="upload_image"),  # POST
     path('<int:pk>/', include([
-        path('', views.get_product, name="get_single_product"),
+        path('', read_views.get_product, name="get_single_product"),
         path('reviews/', views.add_product_review, name="add_review"),  # POST
         path('update/', views.update_product, name="update_product"),  # PUT
         path('addprice/', views.increase_price, name="increase_price"),  # PUT
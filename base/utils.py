@@ -0,0 +1,72 @@
+import logging
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+from django.test.utils import CaptureQueriesContext
+from rest_framework.utils.encoders import JSONEncoder
+
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Обработчик выполнил больше SQL-запросов, чем ему разрешено"""
+
+
+@contextmanager
+def query_budget(max_queries: int, label: str = '', using: str = 'default'):
+    """Считает запросы к БД внутри блока и сообщает о превышении бюджета.
+
+    В строгом режиме (QUERY_BUDGET_STRICT, например в тестах) превышение вызывает исключение,
+    в режиме DEBUG - только предупреждение в лог. В продакшене подсчет не ведется.
+    """
+    strict = getattr(settings, 'QUERY_BUDGET_STRICT', False)
+    if not (strict or settings.DEBUG):
+        yield None
+        return
+
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+
+    executed = len(context)
+    if executed > max_queries:
+        message = f'{label or "block"}: {executed} queries executed, budget is {max_queries}'
+        if strict:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+def with_query_budget(max_queries: int):
+    """Декоратор представления: оборачивает обработчик в query_budget"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            with query_budget(max_queries, label=view.__name__):
+                return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class DataJsonResponse(JsonResponse):
+    """JSON-ответ для асинхронных представлений: кодирует данные как JSONRenderer DRF
+    и, как Response, хранит исходные данные в .data"""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('encoder', JSONEncoder)
+        kwargs.setdefault('safe', False)
+        kwargs.setdefault('json_dumps_params', {'ensure_ascii': False, 'separators': (',', ':')})
+        super().__init__(data, **kwargs)
+        self.data = data
+
+
+def async_require_get(view):
+    """require_GET для асинхронных представлений (декораторы django.views.decorators в Django 4.2 их не поддерживают)"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return DataJsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+        return await view(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,97 @@
+import math
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+from rest_framework import status
+
+from base.cache import cache_anonymous_response_async, product_scopes
+from base.catalog import PRODUCTS_PER_PAGE, CatalogParamsError, catalog_queryset, page_number, top_products_params
+from base.leaderboard import top_entries
+from base.models import *
+from base.pagination import CURSOR_ORDERINGS, InvalidCursor, apaginate_by_cursor
+from base.search import search_products
+from base.serializers import PRODUCT_EXPANSIONS, ProductFieldset
+from base.utils import DataJsonResponse, async_require_get
+
+
+# Асинхронные версии публичных эндпоинтов чтения каталога для запуска под ASGI (ASYNC_CATALOG_VIEWS).
+# Запросы к БД выполняются асинхронным ORM, ответы совпадают с ответами синхронных представлений.
+
+
+def error_response(detail: str, code: int = status.HTTP_400_BAD_REQUEST) -> DataJsonResponse:
+    return DataJsonResponse({'detail': detail}, status=code)
+
+
+@async_require_get
+@cache_anonymous_response_async('products')
+async def get_products(request: ASGIRequest) -> DataJsonResponse:
+    query = request.GET.get('keyword', '').strip()
+    try:
+        products, fieldset = catalog_queryset(request.GET)
+    except CatalogParamsError as error:
+        return error_response(str(error))
+
+    # Поиск идет по сырому SQL полнотекстового индекса, для него нет асинхронного API
+    found_ids = await sync_to_async(search_products)(products, query) if query else None
+
+    if 'cursor' in request.GET or request.GET.get('paginate') == 'cursor':
+        ordering = request.GET.get('ordering', 'created_at')
+        if found_ids is not None:
+            products = products.filter(pk__in=found_ids)
+        products = fieldset.apply(products, ordering) if ordering in CURSOR_ORDERINGS else products
+        try:
+            page = await apaginate_by_cursor(products, ordering, request.GET.get('cursor'), PRODUCTS_PER_PAGE)
+        except InvalidCursor:
+            return error_response('Invalid cursor')
+        return DataJsonResponse({'products': fieldset.serialize(page.items, many=True),
+                                 'next': page.next, 'previous': page.previous})
+
+    try:
+        page = int(request.GET.get('page', 1))
+    except ValueError:
+        page = 1
+    products = fieldset.apply(products)
+    total = len(found_ids) if found_ids is not None else await products.acount()
+    pages = max(math.ceil(total / PRODUCTS_PER_PAGE), 1)
+    offset = (page_number(page, pages) - 1) * PRODUCTS_PER_PAGE
+
+    if found_ids is None:
+        items = [product async for product in products[offset:offset + PRODUCTS_PER_PAGE]]
+    else:
+        page_ids = found_ids[offset:offset + PRODUCTS_PER_PAGE]
+        found = await products.ain_bulk(page_ids)
+        items = [found[pk] for pk in page_ids if pk in found]
+
+    return DataJsonResponse({'products': fieldset.serialize(items, many=True), 'page': page, 'pages': pages})
+
+
+@async_require_get
+@cache_anonymous_response_async('top_products')
+async def get_top_products(request: ASGIRequest) -> DataJsonResponse:
+    try:
+        limit, min_rating, category_id, fieldset = top_products_params(request.GET)
+        category = await Category.objects.aget(pk=category_id) if category_id else None
+    except CatalogParamsError as error:
+        return error_response(str(error))
+    except Category.DoesNotExist:
+        return error_response('Invalid leaderboard parameters')
+
+    entries = top_entries(min_rating, category, columns=fieldset.fields, with_reviews=fieldset.with_reviews)
+    products = [entry.product async for entry in entries[:limit]]
+    return DataJsonResponse(fieldset.serialize(products, many=True))
+
+
+@async_require_get
+@cache_anonymous_response_async('product', scopes=product_scopes)
+async def get_product(request: ASGIRequest, pk: int) -> DataJsonResponse:
+    try:
+        fieldset = ProductFieldset(request.GET, default_expand=PRODUCT_EXPANSIONS)
+    except ValueError as error:
+        return error_response(str(error))
+    try:
+        product = await fieldset.apply(Product.objects.all()).aget(pk=pk)
+    except Product.DoesNotExist:
+        return error_response('Not found.', status.HTTP_404_NOT_FOUND)
+
+    return DataJsonResponse(fieldset.serialize(product))
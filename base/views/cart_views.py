@@ -0,0 +1,64 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.handlers.wsgi import WSGIRequest
+
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from base.cart import replace_cart, validate_items
+from base.models import *
+from base.serializers import CartItemSerializer
+from base.utils import with_query_budget
+
+
+def get_cart_items(user_id: int):
+    return CartItem.objects.filter(customer_id=user_id).select_related('product').order_by('added_at')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@with_query_budget(1)
+def get_cart(request: WSGIRequest) -> Response:
+    serializer = CartItemSerializer(get_cart_items(request.user.pk), many=True)
+
+    return Response(serializer.data)
+
+
+@api_view(['PUT'])
+@permission_classes([IsAuthenticated])
+def update_cart(request: WSGIRequest) -> Response:
+    if not isinstance(request.data, dict):
+        return Response({'detail': 'Invalid cart data'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        items = [(int(item['product']), int(item['qty'])) for item in request.data.get('cartItems', [])]
+    except (KeyError, TypeError, ValueError):
+        return Response({'detail': 'Invalid cart data'}, status=status.HTTP_400_BAD_REQUEST)
+
+    missing = replace_cart(request.user.pk, items)
+    serializer = CartItemSerializer(get_cart_items(request.user.pk), many=True)
+    return Response({'cartItems': serializer.data, 'missing': missing})
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@with_query_budget(2)
+def validate_cart(request: WSGIRequest) -> Response:
+    if not isinstance(request.data, dict):
+        return Response({'detail': 'Invalid cart data'}, status=status.HTTP_400_BAD_REQUEST)
+    # Без тела запроса проверяется сохраненная корзина пользователя, иначе - переданные позиции
+    cart_items = request.data.get('cartItems')
+    try:
+        if cart_items is None:
+            items = [(pk, quantity, None) for pk, quantity in
+                     CartItem.objects.filter(customer_id=request.user.pk).values_list('product_id', 'quantity')]
+        else:
+            items = [(int(item['product']), int(item['qty']),
+                      Decimal(str(item['price'])) if item.get('price') is not None else None)
+                     for item in cart_items]
+    except (KeyError, TypeError, ValueError, InvalidOperation):
+        return Response({'detail': 'Invalid cart data'}, status=status.HTTP_400_BAD_REQUEST)
+
+    results = validate_items(items)
+    return Response({'valid': not any(result['problems'] for result in results), 'items': results})
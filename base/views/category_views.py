@@ -0,0 +1,15 @@
+from django.core.handlers.wsgi import WSGIRequest
+
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from base.cache import cache_anonymous_response
+from base.categories import build_category_tree
+from base.utils import with_query_budget
+
+
+@api_view(['GET'])
+@cache_anonymous_response('category_tree')
+@with_query_budget(1)
+def get_category_tree(request: WSGIRequest) -> Response:
+    return Response(build_category_tree())
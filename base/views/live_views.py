@@ -0,0 +1,76 @@
+import time
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+from rest_framework import status
+
+from base.live import LIVE_FIELDS, LIVE_KINDS, channel, encode_event, get_broker, live_values
+from base.utils import DataJsonResponse, async_require_get
+
+
+# Пауза перед переподключением EventSource после обрыва соединения, мс
+RETRY_MS = 3000
+
+
+def parse_channels(params) -> list:
+    """Каналы из параметров запроса: ?products=1,2&lots=3"""
+    channels = {}
+    for kind, model in LIVE_KINDS.items():
+        for value in params.get(kind, '').split(','):
+            if value.strip():
+                channels[model, int(value)] = None
+    return list(channels)
+
+
+async def event_stream(channels: list):
+    """Поток событий соединения: текущие значения полей, затем их изменения.
+
+    Соединение закрывается через LIVE_MAX_DURATION секунд, EventSource переподключается сам.
+    Отключение клиента Django 4.2 потоку не передает, поэтому только этот срок и ограничивает
+    жизнь соединения, брошенного клиентом.
+    """
+    broker = get_broker()
+    subscription = broker.subscribe(channel(model, pk) for model, pk in channels)
+    deadline = time.monotonic() + getattr(settings, 'LIVE_MAX_DURATION', 60)
+    heartbeat = getattr(settings, 'LIVE_HEARTBEAT', 15)
+    try:
+        yield f'retry: {RETRY_MS}\n\n'
+        # Снимок после подписки: изменения, случившиеся во время его чтения, придут следом
+        for model in {model for model, _ in channels}:
+            pks = [pk for kind, pk in channels if kind is model]
+            async for values in model.objects.filter(pk__in=pks).values('pk', *LIVE_FIELDS[model]):
+                yield encode_event(channel(model, values.pop('pk')), live_values(model, values))
+
+        while time.monotonic() < deadline:
+            changes = await subscription.next(min(heartbeat, max(deadline - time.monotonic(), 0)))
+            if not changes:
+                # Комментарий не дает прокси закрыть простаивающее соединение
+                yield ': keepalive\n\n'
+            for name, data in changes:
+                yield encode_event(name, data)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+@async_require_get
+async def live_updates(request: ASGIRequest) -> StreamingHttpResponse:
+    if not isinstance(request, ASGIRequest):
+        return DataJsonResponse({'detail': 'Live updates are only served by the ASGI application'},
+                                status=status.HTTP_501_NOT_IMPLEMENTED)
+    try:
+        channels = parse_channels(request.GET)
+    except ValueError:
+        return DataJsonResponse({'detail': 'Invalid ids'}, status=status.HTTP_400_BAD_REQUEST)
+    if not channels:
+        return DataJsonResponse({'detail': 'Nothing to subscribe to'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(channels) > getattr(settings, 'LIVE_MAX_CHANNELS', 50):
+        return DataJsonResponse({'detail': 'Too many subscriptions in one request'},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+    response = StreamingHttpResponse(event_stream(channels), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Отключает буферизацию ответа в nginx
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,105 @@
+from datetime import datetime
+from typing import Optional
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.response import Response
+
+from base.auction import BidRejected, parse_amount, place_bid as accept_bid
+from base.models import *
+from base.serializers import BidSerializer, LotSerializer
+
+
+BID_REJECTION_STATUSES = {
+    'invalid': status.HTTP_400_BAD_REQUEST,
+    'not_found': status.HTTP_404_NOT_FOUND,
+    'closed': status.HTTP_409_CONFLICT,
+    'stale': status.HTTP_409_CONFLICT,
+    'too_low': status.HTTP_409_CONFLICT,
+}
+
+
+def parse_ends_at(value) -> Optional[datetime]:
+    """Время окончания торгов в ISO 8601; после него лот закрывает команда settle_lots"""
+    if not value:
+        return None
+    ends_at = parse_datetime(value)
+    if ends_at is None:
+        raise ValueError(value)
+    if timezone.is_naive(ends_at):
+        ends_at = timezone.make_aware(ends_at)
+    if ends_at <= timezone.now():
+        raise ValueError(value)
+    return ends_at
+
+
+@api_view(['GET'])
+def get_lots(request: WSGIRequest) -> Response:
+    lots = Lot.objects.filter(is_active=True).order_by('-created_at')
+    serializer = LotSerializer(lots, many=True)
+
+    return Response(serializer.data)
+
+
+@api_view(['GET'])
+def get_lot(request: WSGIRequest, pk: int) -> Response:
+    lot = Lot.objects.get(pk=pk)
+    bids = lot.bids.order_by('-lot_version')[:10]
+    data = LotSerializer(lot, many=False).data
+    data['bids'] = BidSerializer(bids, many=True).data
+
+    return Response(data)
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def create_lot(request: WSGIRequest) -> Response:
+    data = request.data
+    product = Product.objects.get(pk=data['product'])
+    start_price = data.get('start_price', product.price)
+    try:
+        ends_at = parse_ends_at(data.get('ends_at'))
+    except (TypeError, ValueError):
+        return Response({'detail': 'ends_at must be a future date and time'}, status=status.HTTP_400_BAD_REQUEST)
+    lot = Lot.objects.create(
+        product=product,
+        start_price=start_price,
+        current_price=start_price,
+        min_step=data.get('min_step', 1),
+        ends_at=ends_at,
+    )
+
+    serializer = LotSerializer(lot, many=False)
+    return Response(serializer.data)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def place_bid(request: WSGIRequest, pk: int) -> Response:
+    data = request.data
+    # amount - максимальная сумма автоставки, version - версия лота, которую видел клиент:
+    # если лот успел измениться, ставка отклоняется
+    expected_version = data.get('version')
+    try:
+        amount = parse_amount(data.get('amount'))
+        result = accept_bid(pk, request.user, amount, None if expected_version is None else int(expected_version))
+    except (TypeError, ValueError):
+        return Response({'detail': 'Invalid lot version'}, status=status.HTTP_400_BAD_REQUEST)
+    except BidRejected as rejection:
+        content = {'detail': rejection.detail, 'code': rejection.code}
+        if rejection.lot is not None:
+            content['lot'] = LotSerializer(rejection.lot, many=False).data
+        return Response(content, status=BID_REJECTION_STATUSES[rejection.code])
+
+    content = {
+        'leading': result.leading,
+        'max_amount': str(amount),
+        'lot': LotSerializer(result.lot, many=False).data,
+        'bid': BidSerializer(result.bid, many=False).data if result.bid is not None else None,
+    }
+    return Response(content, status=status.HTTP_201_CREATED)
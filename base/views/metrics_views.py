@@ -0,0 +1,27 @@
+from django.core.handlers.wsgi import WSGIRequest
+
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from base.metrics import PERCENTILES, registry
+from base.throttling import throttle_stats
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def get_endpoint_metrics(request: WSGIRequest) -> Response:
+    """Скользящая статистика времени ответа по эндпоинтам текущего процесса, по убыванию p95,
+    и счетчики ограничения частоты запросов"""
+    summary = registry.summary()
+    slowest = sorted(summary, key=lambda endpoint: summary[endpoint].get('p95_ms') or 0, reverse=True)
+    return Response({'percentiles': PERCENTILES, 'endpoints': {endpoint: summary[endpoint] for endpoint in slowest},
+                     'throttles': throttle_stats.summary()})
+
+
+@api_view(['DELETE'])
+@permission_classes([IsAdminUser])
+def reset_endpoint_metrics(request: WSGIRequest) -> Response:
+    registry.reset()
+    throttle_stats.reset()
+    return Response('Metrics reset')
@@ -1,128 +1,146 @@
-# # Django Import
-# from django.core.exceptions import RequestDataTooBig
-# from django.shortcuts import render
-# from datetime import datetime
-#
-# from rest_framework import status
-#
-# # Rest Framework Import
-# from rest_framework.decorators import api_view, permission_classes
-# from rest_framework.permissions import IsAuthenticated, IsAdminUser
-# from rest_framework.response import Response
-# from rest_framework.serializers import Serializer
-#
-# # Local Import
-# from base.products import products
-# from base.models import *
-# from base.serializers import ProductSerializer, OrderSerializer
-#
-#
-# # views start from here
-#
-# @api_view(['POST'])
-# @permission_classes([IsAuthenticated])
-# def addOrderItems(request):
-#     user = request.user
-#     data = request.data
-#     print(data)
-#     orderItems = data['orderItems']
-#
-#     if orderItems and len(orderItems) == 0:
-#         return Response({'detail': 'No Order Items',
-#                          "status": status.HTTP_400_BAD_REQUEST})
-#     else:
-#         # (1) Create Order
-#         order = Order.objects.create(
-#             user=user,
-#             paymentMethod=data['paymentMethod'],
-#             taxPrice=data['taxPrice'],
-#             shippingPrice=data['shippingPrice'],
-#             totalPrice=data['totalPrice'],
-#         )
-#
-#         # (2) Create Shipping Address
-#
-#         shipping = ShippingAddress.objects.create(
-#             order=order,
-#             address=data['shippingAddress']['address'],
-#             city=data['shippingAddress']['city'],
-#             postalCode=data['shippingAddress']['postalCode'],
-#             country=data['shippingAddress']['country'],
-#         )
-#
-#         # (3) Create order items
-#
-#         for i in orderItems:
-#             product = Product.objects.get(_id=i['product'])
-#
-#             item = OrderItem.objects.create(
-#                 product=product,
-#                 order=order,
-#                 name=product.name,
-#                 qty=i['qty'],
-#                 price=i['price'],
-#                 image=product.image.url,
-#             )
-#
-#             # (4) Update Stock
-#
-#             product.countInStock -= item.qty
-#             product.save()
-#
-#         serializer = OrderSerializer(order, many=False)
-#         return Response(serializer.data)
-#
-#
-# @api_view(['GET'])
-# @permission_classes([IsAuthenticated])
-# def getMyOrders(request):
-#     user = request.user
-#     orders = user.order_set.all()
-#     serializer = OrderSerializer(orders, many=True)
-#     return Response(serializer.data)
-#
-#
-# @api_view(['GET'])
-# @permission_classes([IsAdminUser])
-# def getOrders(request):
-#     orders = Order.objects.all()
-#     serializer = OrderSerializer(orders, many=True)
-#     return Response(serializer.data)
-#
-#
-# @api_view(['GET'])
-# @permission_classes([IsAuthenticated])
-# def getOrderById(request, pk):
-#     user = request.user
-#
-#     try:
-#         order = Order.objects.get(_id=pk)
-#         if user.is_staff or order.user == user:
-#             serializer = OrderSerializer(order, many=False)
-#             return Response(serializer.data)
-#         else:
-#             Response({'detail': 'Not Authorized  to view this order'},
-#                      status=status.HTTP_400_BAD_REQUEST)
-#     except:
-#         return Response({'detail': 'Order does not exist'},
-#                         status=status.HTTP_400_BAD_REQUEST)
-#
-#
-# @api_view(['PUT'])
-# @permission_classes([IsAuthenticated])
-# def updateOrderToPaid(request, pk):
-#     order = Order.objects.get(_id=pk)
-#     order.isPaid = True
-#     order.paidAt = datetime.now()
-#     order.save()
-#     return Response('Order was paid')
-#
-#
-# @api_view(['PUT'])
-# @permission_classes([IsAdminUser])
-# def updateOrderToDelivered(request, pk):
-#     order = Order.objects.get(_id=pk)
-#     order.isDeliver = True
-#     order.deliveredAt = datetime.now()
-#     order.save()
-#     return Response('Order was Delivered')
+import json
+from decimal import Decimal, InvalidOperation
+from typing import AsyncIterator, Iterator, List
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.handlers.wsgi import WSGIRequest
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from base.models import *
+from base.orders import OrderRejected, place_order
+from base.serializers import OrderSerializer
+from base.utils import with_query_budget
+
+
+ORDERS_CHUNK_SIZE = 500
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def add_order_items(request: WSGIRequest) -> Response:
+    user = request.user
+    data = request.data
+    order_items = data.get('orderItems')
+
+    if not order_items:
+        return Response({'detail': 'No Order Items'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        items = [(int(item['product']), int(item['qty'])) for item in order_items]
+        order = place_order(
+            user,
+            items,
+            address=data['shippingAddress'],
+            payment_method=data.get('paymentMethod', ''),
+            tax=Decimal(str(data.get('taxPrice', 0))),
+            delivery_cost=Decimal(str(data.get('shippingPrice', 0))),
+        )
+    except (KeyError, TypeError, ValueError, InvalidOperation):
+        return Response({'detail': 'Invalid order data'}, status=status.HTTP_400_BAD_REQUEST)
+    except OrderRejected as rejection:
+        content = {'detail': rejection.detail, 'products': rejection.unavailable}
+        return Response(content, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = OrderSerializer(order, many=False)
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@with_query_budget(2)
+def get_my_orders(request: WSGIRequest) -> Response:
+    orders = Order.objects.filter(customer_id=request.user.pk).order_by('-created_at')
+    orders = OrderSerializer.setup_eager_loading(orders)
+    serializer = OrderSerializer(orders, many=True)
+
+    return Response(serializer.data)
+
+
+def stream_orders(orders) -> Iterator[str]:
+    """JSON-массив заказов по частям: в памяти одновременно держится только одна пачка заказов"""
+    yield '['
+    for number, order in enumerate(orders.iterator(chunk_size=ORDERS_CHUNK_SIZE)):
+        data = OrderSerializer(order, many=False).data
+        yield (',' if number else '') + json.dumps(data, cls=JSONEncoder, ensure_ascii=False)
+    yield ']'
+
+
+def encode_orders(orders: List[Order]) -> List[str]:
+    # Позиции пачки подгружаются одним запросом, как в OrderSerializer.setup_eager_loading
+    prefetch_related_objects(orders, 'order_items')
+    return [json.dumps(OrderSerializer(order, many=False).data, cls=JSONEncoder, ensure_ascii=False)
+            for order in orders]
+
+
+async def astream_orders(orders) -> AsyncIterator[str]:
+    """stream_orders для ASGI: синхронный поток Django 4.2 под ASGI целиком читает в память.
+
+    aiterator в Django 4.2 не поддерживает prefetch_related, поэтому позиции подгружаются
+    и заказы сериализуются отдельно для каждой пачки.
+    """
+    yield '['
+    chunk, first = [], True
+    async for order in orders.aiterator(chunk_size=ORDERS_CHUNK_SIZE):
+        chunk.append(order)
+        if len(chunk) == ORDERS_CHUNK_SIZE:
+            yield ('' if first else ',') + ','.join(await sync_to_async(encode_orders)(chunk))
+            chunk, first = [], False
+    if chunk:
+        yield ('' if first else ',') + ','.join(await sync_to_async(encode_orders)(chunk))
+    yield ']'
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def get_orders(request: WSGIRequest) -> StreamingHttpResponse:
+    orders = OrderSerializer.setup_eager_loading(Order.objects.order_by('-created_at'))
+    if isinstance(request._request, ASGIRequest):
+        # Под ASGI Django 4.2 отдает по частям только асинхронный поток
+        return StreamingHttpResponse(astream_orders(orders.prefetch_related(None)), content_type='application/json')
+    return StreamingHttpResponse(stream_orders(orders), content_type='application/json')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@with_query_budget(2)
+def get_order_by_id(request: WSGIRequest, pk: int) -> Response:
+    user = request.user
+    order = OrderSerializer.setup_eager_loading(Order.objects.filter(pk=pk)).first()
+
+    if order is None:
+        return Response({'detail': 'Order does not exist'}, status=status.HTTP_404_NOT_FOUND)
+    if not user.is_staff and order.customer_id != user.pk:
+        return Response({'detail': 'Not authorized to view this order'}, status=status.HTTP_403_FORBIDDEN)
+
+    serializer = OrderSerializer(order, many=False)
+    return Response(serializer.data)
+
+
+@api_view(['PUT'])
+@permission_classes([IsAuthenticated])
+def update_order_to_paid(request: WSGIRequest, pk: int) -> Response:
+    orders = Order.objects.filter(pk=pk)
+    if not request.user.is_staff:
+        orders = orders.filter(customer_id=request.user.pk)
+    if not orders.update(is_paid=True, paid_at=timezone.now()):
+        return Response({'detail': 'Order does not exist'}, status=status.HTTP_404_NOT_FOUND)
+
+    return Response('Order was paid')
+
+
+@api_view(['PUT'])
+@permission_classes([IsAdminUser])
+def update_order_to_delivered(request: WSGIRequest, pk: int) -> Response:
+    if not Order.objects.filter(pk=pk).update(is_delivered=True, delivered_at=timezone.now()):
+        return Response({'detail': 'Order does not exist'}, status=status.HTTP_404_NOT_FOUND)
+
+    return Response('Order was delivered')
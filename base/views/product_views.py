@@ -2,58 +2,131 @@ from _decimal import Decimal
 
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Round
 
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 
+from base.aggregates import apply_review_rating
+from base.cache import CATALOG_SCOPE, cache_anonymous_response, invalidate_on_commit, product_scope, product_scopes
+from base.bulk_edit import BulkUpdateRejected, adjust_prices, apply_updates
+from base.cart import load_products, parse_ids
+from base.catalog import PRODUCTS_PER_PAGE, CatalogParamsError, catalog_queryset, top_products_params
+from base.images import save_upload
+from base.leaderboard import get_top_products as get_leaderboard
+from base.live import publish_current
 from base.models import *
-from base.serializers import ProductSerializer
+from base.pagination import CURSOR_ORDERINGS, InvalidCursor, paginate_by_cursor
+from base.search import search_products
+from base.serializers import PRODUCT_EXPANSIONS, ProductFieldset, ProductSerializer, ProductSlimSerializer
+from base.throttling import PriceIPThrottle, PriceUserThrottle, ReviewIPThrottle, ReviewUserThrottle
+from base.utils import with_query_budget
 
 
 @api_view(['GET'])
+@cache_anonymous_response('products')
+@with_query_budget(4)
 def get_products(request: WSGIRequest) -> Response:
-    query = request.query_params.get('keyword', '')
-    products = Product.objects.filter(title__icontains=query, stock_quantity__gte=1)  #.order_by('-_id')
+    query = request.query_params.get('keyword', '').strip()
+    try:
+        products, fieldset = catalog_queryset(request.query_params)
+    except CatalogParamsError as error:
+        return Response({'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+    # id найденных товаров в порядке релевантности (поиск по полнотекстовому индексу)
+    found_ids = search_products(products, query) if query else None
+
+    # Постраничная навигация по курсору: без COUNT(*) и OFFSET, включается параметрами cursor/paginate
+    if 'cursor' in request.query_params or request.query_params.get('paginate') == 'cursor':
+        ordering = request.query_params.get('ordering', 'created_at')
+        if found_ids is not None:
+            products = products.filter(pk__in=found_ids)
+        # Поле сортировки нужно для курсора следующей страницы
+        products = fieldset.apply(products, ordering) if ordering in CURSOR_ORDERINGS else products
+        try:
+            page = paginate_by_cursor(products, ordering, request.query_params.get('cursor'), PRODUCTS_PER_PAGE)
+        except InvalidCursor:
+            return Response({'detail': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'products': fieldset.serialize(page.items, many=True), 'next': page.next, 'previous': page.previous})
+
+    products = fieldset.apply(products)
     page = int(request.query_params.get('page', 1))
-    paginator = Paginator(products, 8)
+    paginator = Paginator(products if found_ids is None else found_ids, PRODUCTS_PER_PAGE)
 
     try:
-        products = paginator.page(page)
+        products_page = paginator.page(page)
     except PageNotAnInteger:
-        products = paginator.page(1)
+        products_page = paginator.page(1)
     except EmptyPage:
-        products = paginator.page(paginator.num_pages)
+        products_page = paginator.page(paginator.num_pages)
 
-    serializer = ProductSerializer(products, many=True)
+    if found_ids is None:
+        products = products_page
+    else:
+        found = products.in_bulk(products_page.object_list)
+        products = [found[pk] for pk in products_page.object_list if pk in found]
 
-    return Response({'products': serializer.data, 'page': page, 'pages': paginator.num_pages})
+    return Response({'products': fieldset.serialize(products, many=True), 'page': page, 'pages': paginator.num_pages})
 
 
 @api_view(['GET'])
+@cache_anonymous_response('top_products')
+@with_query_budget(3)
 def get_top_products(request: WSGIRequest) -> Response:
-    products = Product.objects.filter(rating__gte=4).order_by('-rating')[0:5]
-    serializer = ProductSerializer(products, many=True)
+    """Лучшие товары: ?limit, ?min_rating (не ниже TOP_PRODUCTS['FLOOR_RATING'], порога витрины), ?category"""
+    try:
+        limit, min_rating, category_id, fieldset = top_products_params(request.query_params)
+        category = Category.objects.get(pk=category_id) if category_id else None
+    except CatalogParamsError as error:
+        return Response({'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+    except Category.DoesNotExist:
+        return Response({'detail': 'Invalid leaderboard parameters'}, status=status.HTTP_400_BAD_REQUEST)
 
-    return Response(serializer.data)
+    # Товары берутся из витрины, которая поддерживается при изменении рейтинга, без сортировки всей таблицы
+    products = get_leaderboard(limit, min_rating, category,
+                               columns=fieldset.fields, with_reviews=fieldset.with_reviews)
+
+    return Response(fieldset.serialize(products, many=True))
 
 
 @api_view(['GET'])
+@cache_anonymous_response('product', scopes=product_scopes)
+@with_query_budget(2)
 def get_product(request: WSGIRequest, pk) -> Response:
-    product = Product.objects.get(pk=pk)
-    serializer = ProductSerializer(product, many=False)
+    # По умолчанию карточка товара отдается целиком, вместе с отзывами
+    try:
+        fieldset = ProductFieldset(request.query_params, default_expand=PRODUCT_EXPANSIONS)
+    except ValueError as error:
+        return Response({'detail': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+    product = fieldset.apply(Product.objects.all()).get(pk=pk)
 
-    return Response(serializer.data)
+    return Response(fieldset.serialize(product))
+
+
+@api_view(['GET'])
+@with_query_budget(1)
+def get_products_batch(request: WSGIRequest) -> Response:
+    try:
+        ids = parse_ids(request.query_params.get('ids', ''))
+    except ValueError:
+        return Response({'detail': 'Invalid ids'}, status=status.HTTP_400_BAD_REQUEST)
+
+    products = load_products(ids)
+    serializer = ProductSlimSerializer([products[pk] for pk in ids if pk in products], many=True)
+    return Response({'products': serializer.data, 'missing': [pk for pk in ids if pk not in products]})
 
 
 @api_view(['POST'])
 @permission_classes([IsAdminUser])
 def create_product(request):
-    user = request.user
     category = Category.objects.get()
+    # request.user - TokenUser из claims токена, поэтому передается только id
     product = Product.objects.create(
-        customer=user,
+        customer_id=request.user.pk,
         title="Test Product Name",
         price=0,
         vendor="Test Brand",
@@ -83,6 +156,37 @@ def update_product(request, pk):
     return Response(serializer.data)
 
 
+@api_view(['PUT'])
+@permission_classes([IsAdminUser])
+def bulk_update_products(request: WSGIRequest) -> Response:
+    """Пакетное изменение товаров в одной транзакции.
+
+    {"products": [{"id": 1, "price": "10.00"}, ...]} - частичные изменения отдельных товаров,
+    {"price_rule": {"percent": -15, "category": 3}} - изменение цен всех товаров категории и ее подкатегорий.
+    """
+    data = request.data
+    try:
+        if not isinstance(data, dict):
+            raise BulkUpdateRejected('Expected a JSON object')
+        if 'price_rule' in data:
+            rule = data['price_rule']
+            if not isinstance(rule, dict) or 'percent' not in rule:
+                raise BulkUpdateRejected('price_rule needs a percent')
+            category_id = rule.get('category')
+            if category_id is not None and (isinstance(category_id, bool) or not isinstance(category_id, int)):
+                raise BulkUpdateRejected('Invalid category')
+            updated = adjust_prices(rule['percent'], category_id)
+        else:
+            updated = apply_updates(data.get('products'))
+    except BulkUpdateRejected as rejection:
+        content = {'detail': rejection.detail}
+        if rejection.errors:
+            content['errors'] = rejection.errors
+        return Response(content, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({'updated': updated})
+
+
 @api_view(['DELETE'])
 @permission_classes([IsAdminUser])
 def delete_product(request: WSGIRequest, pk: int) -> Response:
@@ -98,21 +202,22 @@ def upload_image(request: WSGIRequest) -> Response:
     image_file = request.FILES.get('image')
     if image_file:
         product = Product.objects.get(pk=product_id)
-        product.picture.save(image_file.name, image_file, save=True)
+        # Оригинал сохраняется сразу, уменьшенные копии строятся в фоне
+        save_upload(product, image_file)
         return Response('Image was successfully uploaded')
     return Response('No images were passed!')
 
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([ReviewUserThrottle, ReviewIPThrottle])
 def add_product_review(request: WSGIRequest, pk: int) -> Response:
     user = request.user
     data = request.data
     product = Product.objects.get(pk=pk)
-    reviews = product.reviews.all()
 
     # 1. Если отзыв уже оставлен данным пользователем:
-    if reviews.filter(user=user).exists():
+    if product.reviews.filter(reviewer_id=user.pk).exists():
         content = {'detail': 'You have already reviewed this product'}
         return Response(content, status=status.HTTP_400_BAD_REQUEST)
 
@@ -121,28 +226,29 @@ def add_product_review(request: WSGIRequest, pk: int) -> Response:
         content = {'detail': 'Please select a rating'}
         return Response(content, status=status.HTTP_400_BAD_REQUEST)
 
-    # 3. Если все норм, создаем отзыв и добавляем к товару:
-    review = Review.objects.create(
-        reviewer=user,
-        to_product=product,
-        title=user.first_name,
-        rating=data['rating'],
-        comment=data['comment'],
-    )
-
-    product.reviews_num = reviews.count()
-    summary_rating = reviews.aggregate(models.Sum('rating')).get('rating__sum')
-    product.rating = summary_rating / product.reviews_num
-    product.save()
+    # 3. Если все норм, создаем отзыв и добавляем оценку к счетчикам товара:
+    with transaction.atomic():
+        review = Review.objects.create(
+            reviewer_id=user.pk,
+            to_product=product,
+            title=user.first_name,
+            rating=data['rating'],
+            comment=data['comment'],
+        )
+        apply_review_rating(product.pk, review.rating)
 
     return Response('Review Added')
 
 
 @api_view(['PUT'])
+@throttle_classes([PriceUserThrottle, PriceIPThrottle])
 def increase_price(request: WSGIRequest, pk: int) -> Response:
     product = Product.objects.get(pk=pk)
-    product.price *= Decimal(1.1)
-    product.save(update_fields='price')
+    # Цена меняется на стороне БД, поэтому одновременные повышения не теряются; результат округляется до копеек
+    Product.objects.filter(pk=pk).update(price=Round(F('price') * Decimal('1.1'), 2))
+    invalidate_on_commit(CATALOG_SCOPE, product_scope(pk))
+    publish_current(Product, [pk], ['price'])
+    product.refresh_from_db(fields=['price'])
     serializer = ProductSerializer(product, many=False)
 
     return Response(serializer.data)
@@ -7,7 +7,7 @@ from django.contrib.auth.hashers import make_password
 from rest_framework import status
 
 # Rest Framework Import
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.serializers import Serializer
@@ -17,8 +17,10 @@ from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.views import TokenObtainPairView
 
 # Local Import
+from base.authentication import add_user_claims
 from base.models import *
 from base.serializers import UserSerializer, UserSerializerWithToken
+from base.throttling import LoginAccountThrottle, LoginIPThrottle, RegisterIPThrottle
 
 
 # # JWT Views
@@ -33,7 +35,7 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
-        token['username'] = user.username
+        add_user_claims(token, user)
         token['message'] = 'TEST TOKEN MESSAGE'
         print(f'{token = }')
         return token
@@ -41,6 +43,8 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
 
 class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
+    # Проверка пароля дорогая: лишние попытки отклоняются до нее
+    throttle_classes = [LoginIPThrottle, LoginAccountThrottle]
 
 
 # SHOP API
@@ -58,6 +62,7 @@ def getRoutes(request):
 
 
 @api_view(['POST'])
+@throttle_classes([RegisterIPThrottle])
 def register_user(request):
     data = request.data
     print(data)
@@ -88,7 +93,8 @@ def get_user_profile(request: WSGIRequest) -> Response:
 @api_view(['PUT'])
 @permission_classes([IsAuthenticated])
 def update_user_profile(request: WSGIRequest) -> Response:
-    user = request.user
+    # request.user может быть TokenUser без записи в БД, поэтому читаем пользователя явно
+    user = User.objects.get(pk=request.user.pk)
     data = request.data
     serializer = UserSerializerWithToken(user, many=False)
     user.first_name = data['name']